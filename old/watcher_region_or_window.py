@@ -10,6 +10,7 @@ Deps:
   - pip install mss pillow pytesseract numpy pywin32
 """
 
+import os
 import time
 import threading
 from dataclasses import dataclass
@@ -25,6 +26,10 @@ from tkinter import ttk, messagebox
 
 import platform, shutil, subprocess, sys
 
+# The activity state machine is shared with the terminal wrapper (powershell1/activity.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "powershell1"))
+from activity import ActivityMachine, DONE
+
 # Region capture
 from mss import mss
 
@@ -175,7 +180,7 @@ class WatcherApp:
         self.running = False
         self.thread = None
         self.last_vec = None
-        self.last_change = time.time()
+        self.activity = ActivityMachine(self.cfg.stable_secs)
         self.text_snapshot = ""
 
         self.mode_var = tk.StringVar(value="region")  # "region" or "window"
@@ -290,7 +295,7 @@ class WatcherApp:
         self.cfg.progress_words = [k.strip() for k in self.avoid_var.get().split(",") if k.strip()]
 
         self.last_vec = None
-        self.last_change = time.time()
+        self.activity = ActivityMachine(self.cfg.stable_secs)
         self.text_snapshot = ""
         mode = self.mode_var.get()
 
@@ -346,8 +351,6 @@ class WatcherApp:
                 mad = float(np.mean(np.abs(vec - self.last_vec)))
                 changed = mad > self.cfg.pixel_threshold
             self.last_vec = vec
-            if changed:
-                self.last_change = time.time()
 
             # OCR snapshot
             arru = np.asarray(img.convert("L"), dtype=np.uint8)
@@ -356,11 +359,13 @@ class WatcherApp:
             clean = normalize_text(txt)
             if clean != self.text_snapshot:
                 self.text_snapshot = clean
-                self.last_change = time.time()
+                changed = True
 
             # Decide
-            now = time.time()
-            stable = now - self.last_change
+            now = time.monotonic()
+            if changed: self.activity.output(now)
+            done = self.activity.expire(now) == DONE
+            stable = now - self.activity.last_out
             have_kw = True
             if self.cfg.require_keyword:
                 have_kw = text_contains_any(self.text_snapshot, self.cfg.keywords)
@@ -368,8 +373,9 @@ class WatcherApp:
                 have_kw = False
             avoid = text_contains_any(self.text_snapshot, self.cfg.progress_words)
 
-            self.status_var.set(f"Stable: {stable:.1f}s | Keyword: {have_kw} | Avoid: {avoid}")
-            if stable >= self.cfg.stable_secs and have_kw and not avoid:
+            self.status_var.set(f"{self.activity.state.capitalize()} | Stable: {stable:.1f}s | "
+                                f"Keyword: {have_kw} | Avoid: {avoid}")
+            if done and have_kw and not avoid:
                 self._ding()
                 self.stop()
                 break
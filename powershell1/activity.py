@@ -0,0 +1,231 @@
+# activity.py — the activity state machine and the output-rate meter, independent of any clock
+# The caller passes "now" in; the live session uses the asyncio loop clock, replay.py a
+# virtual clock over a recording and the old screen watcher wall time between screenshots,
+# so all of them make exactly the same decisions.
+import math
+
+IDLE    = "idle"
+WAITING = "waiting"   # activity seen, not yet a burst
+ACTIVE  = "active"    # writing: ticks run, a stop chime ends it
+DONE    = "done"      # a burst ended (stop chime); the next activity starts over
+
+class ActivityMachine:
+    """idle -> waiting -> active -> done from activity samples at caller-supplied times.
+
+    - waiting -> active once activity has gone on for `min_burst` sec with no gap over
+      `hysteresis` sec (None: quiet_sec); a longer gap drops it back to idle, silently
+    - active -> done after `quiet_sec` without activity (expire), or at once (finish)
+    - done: activity within `debounce` sec of the end is ignored (the repaint after a stop)
+    output() / expire() / finish() return the state they entered, or None: the transitions.
+    With min_burst = debounce = 0 the first sample starts writing (a plain silence timer).
+    """
+
+    def __init__(self, quiet_sec=3.0, min_burst=0.0, hysteresis=None, debounce=0.0):
+        self.quiet_sec = quiet_sec
+        self.min_burst = min_burst
+        self.hysteresis = hysteresis
+        self.debounce = debounce
+        self.state = IDLE
+        self.last_out = None      # time of the last sample that counted
+        self._since = None        # start of the current burst
+        self._ended = None        # when the last burst went done
+
+    @property
+    def writing(self) -> bool:
+        return self.state is ACTIVE
+
+    def output(self, now):
+        """Activity at `now`; WAITING or ACTIVE if it entered that state, else None."""
+        state = self.state
+        if state is ACTIVE:   # the hot path: one compare, one store
+            self.last_out = now
+            return None
+        if state is DONE and now < self._ended + self.debounce: return None
+        if state is not WAITING or now - self.last_out > self._gap():
+            self._since = now     # a new burst (or one whose gap nobody expired yet)
+        self.last_out = now
+        if now - self._since >= self.min_burst:
+            self.state = ACTIVE
+            return ACTIVE
+        if state is WAITING: return None
+        self.state = WAITING
+        return WAITING
+
+    def _gap(self):
+        return self.quiet_sec if self.hysteresis is None else self.hysteresis
+
+    @property
+    def deadline(self):
+        """When expire() changes the state unless activity comes first; None when idle / done."""
+        if self.state is ACTIVE: return self.last_out + self.quiet_sec
+        if self.state is WAITING: return self.last_out + self._gap()
+        return None
+
+    def expire(self, now):
+        """Timer check at `now`: DONE if writing has been quiet for quiet_sec, IDLE if a
+        waiting burst broke off, else None."""
+        deadline = self.deadline
+        if deadline is None or now < deadline: return None
+        return self.finish(now)
+
+    def finish(self, now):
+        """End the burst at `now` without waiting (the child showed a prompt): DONE if it
+        was writing, IDLE if it was still waiting, else None."""
+        if self.state is ACTIVE:
+            self.state, self._ended = DONE, now
+            return DONE
+        if self.state is WAITING:
+            self.state = IDLE
+            return IDLE
+        return None
+
+class GapSketch:
+    """Streaming histogram of the gaps between output chunks: log-spaced buckets, O(1) per gap.
+
+    Gaps under `floor` (a chunk split by the reader, lines of a fast stream) aren't kept; they
+    say nothing about how long a job can pause. Once `window` gaps are in, all counts halve,
+    so the sketch follows the current run rather than the whole session.
+    """
+    PER_OCTAVE = 4   # bucket edges 2**(1/4) apart: a quantile is known within ~19 %
+
+    def __init__(self, floor=0.02, ceiling=60.0, window=2000):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.window = window
+        self.seen = 0              # gaps added, ever
+        self.total = 0.0           # weight now in the buckets
+        self._counts = [0.0] * (int(math.log2(ceiling / floor) * self.PER_OCTAVE) + 1)
+
+    def add(self, gap) -> bool:
+        if not self.floor <= gap <= self.ceiling: return False
+        self._counts[int(math.log2(gap / self.floor) * self.PER_OCTAVE)] += 1
+        self.seen += 1
+        self.total += 1
+        if self.total >= self.window:
+            self._counts = [c / 2 for c in self._counts]
+            self.total /= 2
+        return True
+
+    def quantile(self, q):
+        """Upper edge of the bucket holding the q-quantile (sec); None while empty."""
+        if not self.total: return None
+        target, acc = q * self.total, 0.0
+        for i, c in enumerate(self._counts):
+            acc += c
+            if c and acc >= target: break
+        return min(self.ceiling, self.floor * 2 ** ((i + 1) / self.PER_OCTAVE))
+
+class AdaptiveQuiet:
+    """Quiet window learned from the current run: `multiple` x the `quantile` of the gaps
+    between output chunks, clamped to [min_sec, max_sec].
+
+    The caller passes a fallback (the fixed window) used until `min_gaps` gaps are in. Gaps
+    longer than max_sec are between runs, not inside one, and so is the gap after pause()
+    (a prompt or an input request: the user's think time).
+    """
+    REFRESH = 16   # gaps between quantile recomputations
+
+    def __init__(self, quantile=0.99, multiple=1.5, min_sec=1.0, max_sec=15.0, min_gaps=20):
+        self.quantile = quantile
+        self.multiple = multiple
+        self.min_sec = min_sec
+        self.max_sec = max_sec
+        self.min_gaps = min_gaps
+        self.sketch = GapSketch()
+        self._last = None          # time of the last output, None after pause()
+        self._q = None             # (quantile, value) last computed
+        self._at = -self.REFRESH   # sketch.seen when it was
+
+    def output(self, now):
+        last, self._last = self._last, now
+        if last is not None and now - last <= self.max_sec: self.sketch.add(now - last)
+
+    def pause(self):
+        self._last = None
+
+    def gap_quantile(self):
+        """The `quantile` of the gaps so far (sec), refreshed every REFRESH gaps; None if none."""
+        sk = self.sketch
+        if self._q is None or self._q[0] != self.quantile or sk.seen - self._at >= self.REFRESH:
+            self._q, self._at = (self.quantile, sk.quantile(self.quantile)), sk.seen
+        return self._q[1]
+
+    def threshold(self, fallback):
+        """Quiet window to use now: learned once min_gaps are in, else `fallback`."""
+        gap = self.gap_quantile() if self.sketch.seen >= self.min_gaps else None
+        if gap is None: return fallback
+        return min(self.max_sec, max(self.min_sec, self.multiple * gap))
+
+    def stats(self) -> dict:
+        return {"gaps": self.sketch.seen, "learned": self.sketch.seen >= self.min_gaps,
+                "quantile": self.quantile, "gap_sec": self.gap_quantile(), "threshold_sec": self.threshold(None)}
+
+class RateMeter:
+    """Output rate from chunk timestamps: O(1) per chunk, no timers.
+
+    - bytes/s and lines/s as exponentially weighted rates (time constant `tau` seconds),
+      decayed to "now" when read, so a stalled job reads as falling toward zero
+    - bursts: output after more than `burst_gap` seconds of silence starts a new one
+    - history: bytes per second over the last `history` seconds, for a sparkline
+    """
+    SPARKS = "▁▂▃▄▅▆▇█"
+
+    def __init__(self, tau=2.0, burst_gap=0.5, history=60):
+        self.tau = tau
+        self.burst_gap = burst_gap
+        self.total_bytes = self.total_lines = self.bursts = 0
+        self.peak_bps = 0.0       # highest bytes/s seen (the caller may reset it, e.g. per job)
+        self._bps = self._lps = 0.0
+        self._t = None            # time of the last update
+        self._hist = [0] * history
+        self._sec = None          # whole second the last bucket belongs to
+
+    def update(self, now, nbytes, nlines=0):
+        if self._t is None or now - self._t > self.burst_gap: self.bursts += 1
+        self._decay(now)
+        self._bps += nbytes / self.tau
+        self._lps += nlines / self.tau
+        if self._bps > self.peak_bps: self.peak_bps = self._bps
+        self.total_bytes += nbytes
+        self.total_lines += nlines
+        self._bucket(now)
+        self._hist[self._sec % len(self._hist)] += nbytes
+
+    def _decay(self, now):
+        if self._t is not None and now > self._t:
+            k = math.exp((self._t - now) / self.tau)
+            self._bps *= k
+            self._lps *= k
+        self._t = now if self._t is None else max(self._t, now)
+
+    def _bucket(self, now):
+        sec, n = int(now), len(self._hist)
+        if self._sec is None: self._sec = sec
+        if sec > self._sec:
+            for s in range(self._sec + 1, min(sec, self._sec + n) + 1):   # at most one lap
+                self._hist[s % n] = 0
+            self._sec = sec
+
+    def rates(self, now):
+        """(bytes/s, lines/s) decayed to `now` (doesn't change the meter)."""
+        if self._t is None: return 0.0, 0.0
+        k = math.exp(min(0.0, self._t - now) / self.tau)
+        return self._bps * k, self._lps * k
+
+    def history(self, now):
+        """Bytes per whole second, oldest first, ending with the current second."""
+        n = len(self._hist)
+        if self._sec is None: return [0] * n
+        sec = int(now)
+        return [self._hist[s % n] if sec - n < s <= self._sec else 0 for s in range(sec - n + 1, sec + 1)]
+
+    def sparkline(self, now, width=30):
+        hist = self.history(now)[-width:]
+        top = max(hist) or 1
+        return "".join(self.SPARKS[(len(self.SPARKS) - 1) * v // top] for v in hist)
+
+    def stats(self, now) -> dict:
+        bps, lps = self.rates(now)
+        return {"bytes_per_sec": bps, "lines_per_sec": lps, "bursts": self.bursts,
+                "total_bytes": self.total_bytes, "total_lines": self.total_lines,
+                "idle_sec": None if self._t is None else max(0.0, now - self._t)}
@@ -0,0 +1,344 @@
+# audio.py — one long-lived audio worker for the wrapper
+# - A single thread owns the output sink and drains a bounded queue
+# - Overflow policy: drop-oldest, drop-newest, or coalesce back-to-back ticks
+# - Counters (depth, dropped, coalesced, played) stay readable while it runs
+# - Tick stream: one pre-rendered tick+silence period looped into the open sink; streams
+#   from several sessions take turns (winsound: one looping PlaySound of the cached period file)
+# - Sounds already pending when the device frees up are mixed into one buffer
+# - Sinks: winsound (Windows), raw PCM into a long-lived aplay/pacat (Linux),
+#   WAV file, and a null sink that only records timestamps (benchmarks / CI)
+import shutil, subprocess, sys, threading, time
+from collections import deque, namedtuple
+from tones import SAMPLE_RATE, WAV_HEADER, DiskToneCache, mix_wavs, pack_wav_header
+
+DROP_OLDEST = "drop-oldest"   # full queue: discard the oldest pending sound
+DROP_NEWEST = "drop-newest"   # full queue: refuse the incoming sound
+COALESCE    = "coalesce"      # a tick behind a pending tick is merged; full queue drops oldest tick
+POLICIES = (DROP_OLDEST, DROP_NEWEST, COALESCE)
+
+_Item = namedtuple("_Item", "wav dur_ms kind ctl t")  # ctl: (keep_going, done, on_done) for streams
+
+class AudioEngine:
+    """Plays submitted WAVs one after another on a single worker thread."""
+
+    def __init__(self, sink, maxlen=8, policy=COALESCE):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown overflow policy {policy!r}")
+        self.sink = sink
+        self.maxlen = maxlen
+        self.policy = policy
+        self._q = deque()
+        self._cv = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="audio", daemon=True)
+        self.submitted = self.played = self.dropped = self.coalesced = self.errors = 0
+        self.streamed = 0          # tick-stream periods written
+        self.mixed = 0             # sounds folded into another sound's buffer
+        self.max_depth = 0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, wav: bytes, dur_ms: int, kind="sound") -> bool:
+        """Queue a sound; returns False if the overflow policy discarded it."""
+        with self._cv:
+            self.submitted += 1
+            if self._closed:
+                self.dropped += 1
+                return False
+            if self.policy == COALESCE and kind == "tick" and self._q and self._q[-1].kind == "tick":
+                self.coalesced += 1
+                return False
+            # Streams don't count: dropping one would leave its done / on_done unfired and that
+            # session ticking never again (there is at most one per session anyway).
+            if sum(item.kind != "stream" for item in self._q) >= self.maxlen:
+                if self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                self._drop_one()
+            self._q.append(_Item(wav, dur_ms, kind, None, time.monotonic()))
+            self.max_depth = max(self.max_depth, len(self._q))
+            self._cv.notify()
+            return True
+
+    def stream(self, period_wav: bytes, keep_going, on_done=None) -> threading.Event:
+        """Loop one tick+silence period on the sink while keep_going() holds.
+
+        The loop ends on a period boundary, or early if a non-tick sound or another stream
+        is queued (it plays next; concurrent streams take turns a period at a time). Returns an Event that is set once the loop has ended;
+        on_done(), if given, is called from the worker thread at the same time.
+        """
+        done = threading.Event()
+        with self._cv:
+            if self._closed:
+                done.set()
+                return done
+            self._q.append(_Item(period_wav, 0, "stream", (keep_going, done, on_done), time.monotonic()))
+            self._cv.notify()
+        return done
+
+    def _sound_pending(self) -> bool:
+        with self._cv:
+            return self._closed or any(item.kind != "tick" for item in self._q)
+
+    def _drop_one(self):
+        """Make room: the oldest tick (COALESCE), else the oldest sound; never a stream."""
+        for i, item in enumerate(self._q):
+            if item.kind == "tick" or (item.kind != "stream" and self.policy != COALESCE):
+                del self._q[i]
+                break
+        else:
+            i = next(i for i, item in enumerate(self._q) if item.kind != "stream")
+            del self._q[i]
+        self.dropped += 1
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while not self._q and not self._closed:
+                    self._cv.wait()
+                if not self._q: return
+                batch = [self._q.popleft()]
+                while batch[0].kind != "stream" and self._q and self._q[0].kind != "stream":
+                    batch.append(self._q.popleft())
+            item = batch[0]
+            try:
+                if item.kind == "stream":
+                    keep_going, done, on_done = item.ctl
+                    try:
+                        self.streamed += self.sink.stream(
+                            item.wav, lambda: keep_going() and not self._sound_pending())
+                    finally:
+                        done.set()
+                        if on_done: on_done()
+                elif len(batch) == 1:
+                    self.sink.play(item.wav, item.dur_ms)
+                    self.played += 1
+                else:
+                    # One buffer, each sound at its submit-time offset: no competing device opens.
+                    wav = mix_wavs([(it.wav, it.t - item.t) for it in batch])
+                    self.sink.play(wav, max(int((it.t - item.t) * 1000) + it.dur_ms for it in batch))
+                    self.played += 1
+                    self.mixed += len(batch) - 1
+            except Exception:
+                self.errors += 1
+
+    def close(self, timeout=1.0):
+        """Stop accepting sounds; let the worker finish what is queued, then close the sink."""
+        with self._cv:
+            self._closed = True
+            self._cv.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        self.sink.close()
+
+    def stats(self) -> dict:
+        with self._cv:
+            return {"sink": self.sink.name, "depth": len(self._q), "max_depth": self.max_depth,
+                    "maxlen": self.maxlen, "policy": self.policy, "submitted": self.submitted,
+                    "played": self.played, "streamed": self.streamed, "mixed": self.mixed,
+                    "dropped": self.dropped,
+                    "coalesced": self.coalesced, "errors": self.errors}
+
+# ===================== Output sinks =====================
+class AudioSink:
+    """Destination for finished WAVs. play() returns once the sound is done (or handed off)."""
+    name = "base"
+
+    def play(self, wav: bytes, dur_ms: int):
+        raise NotImplementedError
+
+    def preload(self, wavs):
+        """Get sounds that are about to be played ready ahead of time (optional)."""
+
+    def stream(self, period_wav: bytes, keep_going) -> int:
+        """Repeat one period back to back while keep_going(); returns periods written.
+
+        This fallback is one play() per period; sinks that can loop a buffer override it.
+        """
+        rate = WAV_HEADER.unpack_from(period_wav)[7]
+        period = (len(period_wav) - WAV_HEADER.size) / (2.0 * rate)
+        n, t = 0, time.monotonic()
+        while keep_going():
+            self.play(period_wav, int(period * 1000))
+            n += 1
+            t += period
+            time.sleep(max(0.0, t - time.monotonic()))
+        return n
+
+    def close(self):
+        pass
+
+class WinsoundSink(AudioSink):
+    """winsound.PlaySound from memory; cached WAV file, then MessageBeep, as fallbacks."""
+    name = "winsound"
+
+    def __init__(self, disk_cache=None):
+        import winsound
+        self._ws = winsound
+        self.disk = disk_cache or DiskToneCache()
+
+    def preload(self, wavs):
+        try:
+            self.disk.preload(wavs)
+        except OSError:
+            pass
+
+    def play(self, wav: bytes, dur_ms: int):
+        ws = self._ws
+        try:
+            ws.PlaySound(wav, ws.SND_MEMORY)
+        except Exception:
+            try:
+                ws.PlaySound(self.disk.path_for(wav), ws.SND_FILENAME)
+            except Exception:
+                ws.MessageBeep(-1)
+
+    def stream(self, period_wav: bytes, keep_going) -> int:
+        """Loop the period with one PlaySound call: SND_LOOP needs SND_ASYNC, which winsound
+        allows only from a file, so it plays the period's cached WAV. Falls back to one
+        PlaySound per period if the file can't be written or played."""
+        ws = self._ws
+        try:
+            ws.PlaySound(self.disk.path_for(period_wav),
+                         ws.SND_FILENAME | ws.SND_ASYNC | ws.SND_LOOP | ws.SND_NODEFAULT)
+        except Exception:
+            return super().stream(period_wav, keep_going)
+        rate = WAV_HEADER.unpack_from(period_wav)[7]
+        period = (len(period_wav) - WAV_HEADER.size) / (2.0 * rate)
+        n, t0 = 0, time.monotonic()
+        try:
+            while keep_going():
+                n += 1
+                time.sleep(max(0.0, t0 + n * period - time.monotonic()))   # check on period boundaries
+        finally:
+            ws.PlaySound(None, 0)   # stop the loop
+        return n
+
+class PcmPipeSink(AudioSink):
+    """Raw 16-bit PCM streamed into one persistent player process (PulseAudio or ALSA)."""
+    name = "pipe"
+    PLAYERS = {
+        "pacat": ["pacat", "--playback", "--raw", "--format=s16le", "--channels=1", "--rate={rate}"],
+        "aplay": ["aplay", "-q", "-t", "raw", "-f", "S16_LE", "-c", "1", "-r", "{rate}"],
+    }
+
+    def __init__(self, player=None, sample_rate=SAMPLE_RATE):
+        player = player or next((p for p in self.PLAYERS if shutil.which(p)), None)
+        if player not in self.PLAYERS:
+            raise RuntimeError("no PCM player found (install pulseaudio-utils or alsa-utils)")
+        self.player = player
+        self.name = f"pipe:{player}"
+        self.sample_rate = sample_rate
+        self._proc = None
+        self._busy_until = 0.0
+
+    def _open(self, rate):
+        self.close()
+        argv = [a.format(rate=rate) for a in self.PLAYERS[self.player]]
+        self._proc = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.DEVNULL)
+        self.sample_rate = rate
+
+    def play(self, wav: bytes, dur_ms: int):
+        rate = WAV_HEADER.unpack_from(wav)[7]
+        if self._proc is None or self._proc.poll() is not None or rate != self.sample_rate:
+            self._open(rate)
+        self._proc.stdin.write(memoryview(wav)[WAV_HEADER.size:])
+        self._proc.stdin.flush()
+        # The player drains in real time; pace the engine the same way.
+        now = time.monotonic()
+        self._busy_until = max(now, self._busy_until) + (len(wav) - WAV_HEADER.size) / (2.0 * rate)
+        time.sleep(max(0.0, self._busy_until - now))
+
+    def stream(self, period_wav: bytes, keep_going) -> int:
+        """Write periods into the open player, staying one period ahead of playback.
+
+        Spacing is set by the player's sample clock, not by our sleeps, so ticks stay
+        sample-accurate however loaded the machine is.
+        """
+        rate = WAV_HEADER.unpack_from(period_wav)[7]
+        if self._proc is None or self._proc.poll() is not None or rate != self.sample_rate:
+            self._open(rate)
+        pcm = memoryview(period_wav)[WAV_HEADER.size:]
+        period = len(pcm) / (2.0 * rate)
+        n = 0
+        while keep_going():
+            self._proc.stdin.write(pcm)
+            self._proc.stdin.flush()
+            n += 1
+            now = time.monotonic()
+            self._busy_until = max(now, self._busy_until) + period
+            time.sleep(max(0.0, self._busy_until - period - now))
+        return n
+
+    def close(self):
+        if self._proc is not None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=1.0)
+            except Exception:
+                self._proc.kill()
+            self._proc = None
+
+class WavFileSink(AudioSink):
+    """Everything played goes into one WAV file, with real-time gaps kept as silence."""
+    name = "wav"
+    MAX_GAP_SEC = 5.0
+
+    def __init__(self, path, sample_rate=SAMPLE_RATE):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._f = open(path, "wb")
+        self._f.write(bytes(WAV_HEADER.size))
+        self._data = 0
+        self._end = None   # monotonic time the last written sound finishes
+
+    def play(self, wav: bytes, dur_ms: int):
+        now = time.monotonic()
+        if self._end is not None and now > self._end:
+            gap = int(min(now - self._end, self.MAX_GAP_SEC) * self.sample_rate)
+            self._f.write(bytes(2 * gap))
+            self._data += 2 * gap
+        pcm = memoryview(wav)[WAV_HEADER.size:]
+        self._f.write(pcm)
+        self._data += len(pcm)
+        self._end = max(now, self._end or now) + len(pcm) / (2.0 * self.sample_rate)
+
+    def close(self):
+        if self._f.closed: return
+        hdr = bytearray(WAV_HEADER.size)
+        pack_wav_header(hdr, self._data, self.sample_rate)
+        self._f.seek(0)
+        self._f.write(hdr)
+        self._f.close()
+
+class NullSink(AudioSink):
+    """Plays nothing; records (perf_counter, dur_ms, bytes) per sound for benchmarks and CI."""
+    name = "null"
+
+    def __init__(self, realtime=False, maxlen=100_000):
+        self.realtime = realtime     # sleep for the sound's duration, like a real device
+        self.events = deque(maxlen=maxlen)
+
+    def play(self, wav: bytes, dur_ms: int):
+        self.events.append((time.perf_counter(), dur_ms, len(wav)))
+        if self.realtime:
+            time.sleep(dur_ms / 1000.0)
+
+def open_sink(spec=None) -> AudioSink:
+    """Sink from a spec: winsound | pipe[:pacat|:aplay] | wav:PATH | null; None picks for this OS."""
+    if not spec:
+        if sys.platform == "win32":
+            return WinsoundSink()
+        try:
+            return PcmPipeSink()
+        except RuntimeError:
+            return NullSink(realtime=True)
+    kind, _, arg = spec.partition(":")
+    if kind == "winsound": return WinsoundSink()
+    if kind == "pipe": return PcmPipeSink(arg or None)
+    if kind == "wav": return WavFileSink(arg or "jobs-audio.wav")
+    if kind == "null": return NullSink(realtime=(arg == "realtime"))
+    raise ValueError(f"unknown audio sink {spec!r}")
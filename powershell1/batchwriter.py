@@ -0,0 +1,61 @@
+# batchwriter.py — the buffered writer thread behind recorder.Recorder and history.History
+# - Producers (the event loop) only append to a list under a lock: cheap, never touch the disk
+# - One daemon thread wakes once per burst, waits FLUSH_SEC for it to pile up, and hands the
+#   whole batch to _write_batch(): one write / one transaction per burst
+# - close() writes what is buffered and stops the thread
+import threading, time
+
+class BatchWriter:
+    """Base class: subclasses implement _write_batch() and call super().__init__() last (it
+    starts the thread)."""
+    FLUSH_SEC = 0.25     # batch window after the first item of a burst
+
+    def __init__(self, name):
+        self._items = []
+        self._cv = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        with self._cv:
+            if self._closed: return
+            self._items.append(item)
+            if len(self._items) == 1: self._cv.notify()   # one wake-up per batch
+
+    @property
+    def pending(self) -> int:
+        with self._cv:
+            return len(self._items)
+
+    # ===================== Writer thread =====================
+    def _writer_start(self):
+        """Called on the writer thread before the first batch."""
+
+    def _write_batch(self, batch):
+        raise NotImplementedError
+
+    def _writer_done(self):
+        """Called on the writer thread after the last batch."""
+
+    def _run(self):
+        self._writer_start()
+        while True:
+            with self._cv:
+                while not self._items and not self._closed:
+                    self._cv.wait()
+                closed = self._closed
+            if not closed:
+                time.sleep(self.FLUSH_SEC)   # let the burst pile up into one write
+            with self._cv:
+                batch, self._items = self._items, []
+            if batch: self._write_batch(batch)
+            if closed: break
+        self._writer_done()
+
+    def close(self, timeout=2.0):
+        """Write what is buffered and stop the writer thread."""
+        with self._cv:
+            self._closed = True
+            self._cv.notify()
+        self._thread.join(timeout)
@@ -0,0 +1,547 @@
+# bench.py — micro-benchmarks for the wrapper's hot paths (runs headless, any OS)
+#   python bench.py            -> run every bench
+#   python bench.py synth ...  -> run the named benches
+import math, struct, sys, time
+import audio, tones
+
+def _best(fn, repeat=5, number=None):
+    """Best-of-`repeat` seconds per call (auto-scales `number` to ~50 ms)."""
+    if number is None:
+        number, t = 1, 0.0
+        while True:
+            t0 = time.perf_counter()
+            for _ in range(number): fn()
+            t = time.perf_counter() - t0
+            if t >= 0.05: break
+            number *= 4
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number): fn()
+        best = min(best, time.perf_counter() - t0)
+    return best / number
+
+def _legacy_wav_bytes(freq_hz, dur_ms, vol_pct, sample_rate=44100):
+    """The original per-sample loop from index.py, kept as the reference."""
+    n = max(1, int(sample_rate * (dur_ms / 1000.0)))
+    vol = max(0, min(vol_pct, 100)) / 100.0
+    amp = int(32767 * vol)
+    frames = bytearray()
+    w = 2.0 * math.pi * float(freq_hz)
+    for i in range(n):
+        s = int(amp * math.sin(w * (i / sample_rate)))
+        frames += struct.pack("<h", s)
+    data = bytes(frames)
+    sub2 = len(data)
+    hdr = struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + sub2, b"WAVE",
+                      b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16, b"data", sub2)
+    return hdr + data
+
+def _run_session(cmd, settings, stdin=None, prepare=None):
+    """Run `sh -c cmd` to the end in a session.Session on a POSIX pty, into a NullSink.
+
+    stdin: descriptor to use as the keyboard (a console session); None: a background one.
+    prepare(sess) runs just before the loop starts (wrap methods, take the start time).
+    Returns (session, sink) once the child has exited and the engine is closed.
+    """
+    import asyncio, os, session, sounds, terminal
+    sink = audio.NullSink()
+    eng = audio.AudioEngine(sink).start()
+    console = stdin is not None
+    term = terminal.PosixTerminal(["sh", "-c", cmd], stdin=stdin, console=console)
+    with open(os.devnull, "wb") as out:
+        sess = session.Session(term, settings, sounds.Sounds(settings, eng), out=out, console=console)
+        if prepare: prepare(sess)
+        asyncio.run(sess.run())
+    term.close(); eng.close()
+    return sess, sink
+
+# ===================== Benches =====================
+def bench_synth():
+    """Per-sample loop vs batched renderer across tones, durations and sample rates."""
+    print(f"renderer: {'NumPy ' + tones.numpy.__version__ if tones.numpy else 'map() (no NumPy)'}")
+    print(f"{'rate':>6} {'Hz':>5} {'ms':>5} {'legacy us':>10} {'batched us':>11} {'speedup':>8}  hdr  max|d|")
+    for sr in (22050, 44100, 48000):
+        for hz, ms in ((600, 30), (440, 160), (330, 500), (600, 2000), (601, 160)):
+            old, new = _legacy_wav_bytes(hz, ms, 30, sr), tones.wav_bytes(hz, ms, 30, sr)
+            hdr = old[:44] == new[:44]
+            d = max(abs(a - b) for a, b in zip(struct.unpack(f"<{(len(old) - 44) // 2}h", old[44:]),
+                                               struct.unpack(f"<{(len(new) - 44) // 2}h", new[44:])))
+            a = _best(lambda: _legacy_wav_bytes(hz, ms, 30, sr), repeat=3)
+            b = _best(lambda: tones.wav_bytes(hz, ms, 30, sr), repeat=3)
+            print(f"{sr:>6} {hz:>5} {ms:>5} {a * 1e6:>10.1f} {b * 1e6:>11.1f} {a / b:>7.1f}x  {hdr!s:>4}  {d}")
+
+def bench_gain():
+    """Volume change: re-synthesize the tone vs re-scale the cached full-scale period."""
+    print(f"{'tone':>10} {'render us':>10} {'rescale us':>11} {'ratio':>6}")
+    for name, (hz, ms) in (("tick", (600, 30)), ("stop #1", (440, 160)), ("stop #2", (330, 160))):
+        period, n = tones.unit_period(hz, ms)
+        a = _best(lambda: tones.wav_bytes(hz, ms, 37))
+        b = _best(lambda: tones.wav_from_pcm(tones.tile(tones.scale_pcm(period, 37), n)))
+        print(f"{name:>10} {a * 1e6:>10.1f} {b * 1e6:>11.1f} {a / b:>5.1f}x")
+
+def bench_engine():
+    """Headless tick path (cache lookup + gain + queue) into a NullSink: cost and latency."""
+    sink = audio.NullSink()
+    eng = audio.AudioEngine(sink, maxlen=64, policy=audio.DROP_NEWEST).start()
+    cache = tones.ToneCache()
+    cache.get(600, 30, 30)  # warm
+    n, lat = 2000, []
+    t_submit = 0.0
+    for i in range(n):
+        t0 = time.perf_counter()
+        eng.submit(cache.get(600, 30, 30), 30, "tick")
+        t_submit += time.perf_counter() - t0
+        deadline = time.perf_counter() + 0.05
+        while len(sink.events) <= i and time.perf_counter() < deadline:
+            time.sleep(0)
+        if len(sink.events) > i: lat.append(sink.events[i][0] - t0)
+    eng.close()
+    lat.sort()
+    print(f"submit (lookup + enqueue): {t_submit / n * 1e6:.2f} us/tick")
+    print(f"submit -> sink latency: p50 {lat[len(lat) // 2] * 1e6:.0f} us, "
+          f"p99 {lat[int(len(lat) * 0.99)] * 1e6:.0f} us  ({len(lat)}/{n} delivered)")
+    print(f"engine: {eng.stats()}")
+
+def bench_wavetable():
+    """Wavetable oscillator vs math.sin: accuracy over the GUI range, throughput, phase joins."""
+    worst = (-1, 0)
+    for hz in list(range(100, 4001, 10)) + [601, 997.5, 3999.9]:
+        ref = tones._sine(hz, 4410, 32767.0, 44100)
+        got = tones.Oscillator().render(hz, 4410)
+        d = max(map(abs, map(int.__sub__, ref, got)))
+        worst = max(worst, (d, hz))
+    print(f"max |table - sin| over 100..4000 Hz: {worst[0]} LSB (at {worst[1]} Hz)")
+    failed = worst[0] > 1
+    n = 44100
+    a = _best(lambda: tones._sine(601, n, 32767.0, 44100), repeat=3)
+    b = _best(lambda: tones.Oscillator().render(601, n), repeat=3)
+    print(f"1 s @ 601 Hz: math.sin {n / a / 1e6:.2f} Msamples/s, table {n / b / 1e6:.2f} Msamples/s")
+    # Chained render keeps the phase: split one tone in two pieces, compare to one piece.
+    whole = tones.Oscillator().render(437, 8820)
+    osc = tones.Oscillator()
+    split = osc.render(437, 3001) + osc.render(437, 5819)
+    joined = max(map(abs, map(int.__sub__, whole, split)))
+    print(f"phase continuity (split vs whole, 437 Hz): max |d| = {joined} LSB")
+    if failed or joined: sys.exit("wavetable check failed")
+
+def bench_input():
+    """Keystroke forwarding (POSIX pty): idle CPU, and child writes needed for a 100 KB paste."""
+    import os, threading, terminal
+    r, w = os.pipe()
+    term = terminal.PosixTerminal(["sh", "-c", "stty raw -echo; cat > /dev/null"], stdin=r)
+    writes = [0]
+    def pump():
+        while True:
+            keys = term.read_keys()
+            if keys is None: break
+            if keys:
+                writes[0] += 1
+                term.write(keys)
+    th = threading.Thread(target=pump, daemon=True)
+    th.start()
+    c0 = time.process_time()
+    time.sleep(1.0)
+    print(f"idle: {(time.process_time() - c0) * 1000:.2f} ms CPU over 1 s")
+    paste = ("x" * 79 + "\n") * 1280
+    t0 = time.perf_counter()
+    os.write(w, paste.encode())
+    os.close(w)
+    th.join(5)
+    print(f"paste: {len(paste)} chars in {writes[0]} writes, {(time.perf_counter() - t0) * 1000:.1f} ms")
+    term.close()
+
+def bench_passthrough():
+    """Noisy-build throughput (POSIX): unwrapped vs pty + per-chunk str path vs coalesced bytes."""
+    import io, os, subprocess, terminal
+    size = 32 * 1024 * 1024
+    cmd = f"yes 'Compiling crate_name v1.2.3 (/src/crates/crate_name) -- some build output' | head -c {size}"
+
+    def consumer():  # stands in for the terminal: another process draining a pipe
+        return subprocess.Popen(["sh", "-c", "cat > /dev/null"], stdin=subprocess.PIPE)
+
+    def unwrapped():
+        c = consumer()
+        subprocess.run(["sh", "-c", cmd], stdout=c.stdin, check=True)
+        c.stdin.close(); c.wait()
+        return None
+
+    def wrapped(coalesced):
+        r, w = os.pipe()
+        term = terminal.PosixTerminal(["sh", "-c", "stty raw -echo; " + cmd], stdin=r)
+        c = consumer()
+        if coalesced:
+            out = terminal.Passthrough(c.stdin)
+            while True:
+                if out.pending and not term.wait_readable(0): out.flush()
+                chunk = term.read()
+                if not chunk: break
+                out.write(chunk)
+            out.flush()
+            writes = out.writes
+        else:  # the old reader: 4 KiB reads, decode to str, write + flush per chunk
+            text, writes = io.TextIOWrapper(c.stdin, encoding="utf-8"), 0
+            while True:
+                chunk = term.read(4096)
+                if not chunk: break
+                text.write(chunk.decode("utf-8", "replace"))
+                text.flush()
+                writes += 1
+            text.detach()
+        c.stdin.close(); c.wait()
+        term.close()
+        os.close(r); os.close(w)
+        return writes
+
+    for name, fn in (("unwrapped (no pty)", unwrapped), ("pty + per-chunk str", lambda: wrapped(False)),
+                     ("pty + coalesced bytes", lambda: wrapped(True))):
+        t0 = time.perf_counter()
+        writes = fn()
+        t = time.perf_counter() - t0
+        print(f"{name:>22}: {size / t / 1e6:7.1f} MB/s" + (f", {writes} stdout writes" if writes else ""))
+
+def bench_session():
+    """asyncio session (POSIX): CPU while the child is idle vs while it streams output."""
+    import os, session
+    for name, cmd in (("idle 2 s", "sleep 2"), ("8 MB burst", "yes | head -c 8000000; sleep 1.5")):
+        r, w = os.pipe()
+        start = []
+        sess, _ = _run_session("stty raw -echo; " + cmd, session.Settings(quiet_sec=0.5), stdin=r,
+                               prepare=lambda s: start.extend((time.process_time(), time.perf_counter())))
+        c0, t0 = start
+        print(f"{name:>10}: {(time.process_time() - c0) * 1000:7.1f} ms CPU over "
+              f"{time.perf_counter() - t0:.2f} s, {sess.out.writes} stdout writes")
+        os.close(r); os.close(w)
+
+def bench_recorder():
+    """asciicast recorder: hot-path cost per chunk, writer throughput, size-based rotation."""
+    import os, tempfile, recorder, terminal
+    chunk = (b"Compiling crate_name v1.2.3 (/src/crates/crate_name) -- some build output\r\n" * 840)[:64 * 1024]
+    n = 512   # 32 MiB
+    with tempfile.TemporaryDirectory() as d:
+        for name, rec in (("no recorder", None),
+                          ("recorder", recorder.Recorder(os.path.join(d, "s.cast"), max_bytes=16 << 20))):
+            out = terminal.Passthrough(open(os.devnull, "wb"))
+            t0 = time.perf_counter()
+            for _ in range(n):
+                out.write(chunk)
+                if rec: rec.output(chunk)
+            out.flush()
+            hot = time.perf_counter() - t0
+            line = f"{name:>12}: hot path {n * len(chunk) / hot / 1e6:8.1f} MB/s"
+            if rec:
+                rec.close()
+                st = rec.stats()
+                line += (f", writer done after {time.perf_counter() - t0:.2f} s, "
+                         f"{st['bytes'] / 1e6:.1f} MB in {st['files']} files ({len(os.listdir(d))} on disk)")
+            print(line)
+
+def bench_replay():
+    """Replay on a virtual clock: an 8-hour synthetic session (bursty output) per setting."""
+    import random, replay
+    rnd, t, out = random.Random(1), 0.0, []
+    while t < 8 * 3600:
+        for _ in range(rnd.randrange(1, 400)):      # a burst of output chunks
+            t += rnd.expovariate(50.0)
+            out.append(t)
+        t += rnd.expovariate(1 / 20.0)              # then a pause
+    for q in (1.0, 3.0):
+        fired = []
+        dt = _best(lambda: fired.__setitem__(slice(None), replay.replay(out, q, 0.12)), repeat=3)
+        ticks, stops, early, _ = replay.summarize(fired, out, 10.0)
+        print(f"quiet {q:g} s: {len(out)} chunks, {ticks} ticks, {stops} stops ({early} early) "
+              f"in {dt * 1000:.1f} ms = {t / dt:,.0f}x real time")
+
+def bench_mux():
+    """Multiplexer (POSIX): threads, loop memory and CPU for 1 / 10 / 50 background sessions."""
+    import asyncio, threading, tracemalloc, mux, session, sounds
+    script = "for i in 1 2 3 4 5 6 7 8 9 10; do echo build step $i; sleep 0.1; done; sleep 0.5"
+    base_threads = threading.active_count()
+    first = None
+    for n in (1, 10, 50):
+        settings = session.Settings(quiet_sec=0.3)
+        eng = audio.AudioEngine(audio.NullSink()).start()
+        cache = tones.ToneCache()
+        for i in range(n):   # renders first (index.py warms up in the background at startup)
+            sounds.Sounds(settings, eng, cache, sounds.pitch_for(i)).warm_up(background=False)
+        m = mux.Multiplexer(settings, eng, cache)
+        for _ in range(n): m.add(["sh", "-c", script])
+        tracemalloc.start()
+        peak_threads = [0]
+        async def main():
+            async def watch():
+                while True:
+                    peak_threads[0] = max(peak_threads[0], threading.active_count())
+                    await asyncio.sleep(0.05)
+            w = asyncio.ensure_future(watch())
+            await m.run()
+            w.cancel()
+        c0, t0 = time.process_time(), time.perf_counter()
+        asyncio.run(main())
+        cpu, wall = time.process_time() - c0, time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        m.close(); eng.close()
+        st = eng.stats()
+        first = first or peak
+        extra = f" (+{(peak - first) / 1024 / (n - 1):.1f} KB per extra session)" if n > 1 else ""
+        print(f"{n:>3} sessions: {peak_threads[0] - base_threads} threads (incl. audio), "
+              f"{peak / 1024:7.1f} KB peak{extra}, {cpu * 1000 / n:5.1f} ms CPU/session "
+              f"over {wall:.2f} s; {st['streamed']} tick periods, {st['played']} stop chimes ({st['mixed']} mixed in)")
+
+def bench_activity():
+    """Activity state machine: events per second, steady writing and a bursty synthetic stream."""
+    import random
+    import activity
+    rnd, t, times = random.Random(7), 0.0, []
+    while len(times) < 1_000_000:   # bursts of chunks ms apart, gaps of 0.1..8 s between them
+        for _ in range(rnd.randrange(1, 400)):
+            t += rnd.random() * 0.01
+            times.append(t)
+        t += rnd.random() * 8
+    def steady():
+        out = activity.ActivityMachine(3.0).output
+        for t in times: out(t)
+    def bursty(**kw):
+        m = activity.ActivityMachine(3.0, **kw)
+        out, expire, moves = m.output, m.expire, 0
+        for t in times:
+            if expire(t): moves += 1   # the timer check a caller makes before each sample
+            if out(t): moves += 1
+        return moves
+    n = len(times)
+    print(f"output() while writing: {n / (_best(steady, repeat=3, number=1)):>12,.0f} events/s")
+    for kw in ({}, {"min_burst": 0.5, "hysteresis": 0.2, "debounce": 1.0}):
+        moves = bursty(**kw)
+        dt = _best(lambda: bursty(**kw), repeat=3, number=1)
+        label = ", ".join(f"{k}={v}" for k, v in kw.items()) or "defaults"
+        print(f"expire() + output(), {label:<46}: {n / dt:>12,.0f} events/s, {moves} transitions")
+
+def bench_adaptive():
+    """Learned vs fixed quiet window, replayed on synthetic pytest -v / staged-compiler runs."""
+    import random
+    import activity, replay
+    def runs(make, n=40):   # n runs of one job, 20..60 s at the prompt between them
+        rnd, t, out = random.Random(11), 0.0, []
+        for _ in range(n):
+            t = make(rnd, t, out) + rnd.uniform(20, 60)
+        return out
+    def pytest(rnd, t, out):   # a line every ~20 ms, now and then a slow test (0.3..0.8 s)
+        for _ in range(300):
+            t += rnd.uniform(0.3, 0.8) if rnd.random() < 0.02 else rnd.expovariate(50)
+            out.append(t)
+        return t
+    def compiler(rnd, t, out):   # 5 stages of ~50 lines, 4..6 s of silence between them
+        for stage in range(5):
+            if stage: t += rnd.uniform(4, 6)
+            for _ in range(50):
+                t += rnd.expovariate(30)
+                out.append(t)
+        return t
+    print(f"{'job':<9} {'window':<30} {'stops':>6} {'false':>6} {'latency':>8}")
+    for name, make in (("pytest", pytest), ("compiler", compiler)):
+        out = runs(make)
+        for label, quiet, adapt in (("fixed 3 s", 3.0, None), ("fixed 8 s", 8.0, None),
+                                    ("learned 1.5 x p99", 3.0, activity.AdaptiveQuiet())):
+            fired = replay.replay(out, quiet, ticks=False, adapt=adapt)
+            _, stops, early, latency = replay.summarize(fired, out, 10.0)
+            if adapt: label += f" = {adapt.threshold(quiet):.1f} s"
+            print(f"{name:<9} {label:<30} {stops:>6} {early:>6} {latency / max(stops, 1):>7.2f}s")
+
+def bench_history():
+    """Job history: add() cost, batched insert throughput, queries at 300k rows."""
+    import os, random, tempfile, history
+    rnd, now, n = random.Random(5), time.time(), 300_000
+    cmds = [f"npm test --shard {i}" for i in range(20)] + [f"make -j8 target{i}" for i in range(30)]
+    with tempfile.TemporaryDirectory() as d:
+        h = history.History(os.path.join(d, "h.sqlite"))
+        def add():
+            start = now - rnd.random() * 60 * 86400   # 60 days of jobs
+            dur = rnd.lognormvariate(1, 1.2)
+            h.add("bash", rnd.choice(cmds), start, 0.0, dur, rnd.randrange(1 << 20), rnd.randrange(5000),
+                  rnd.random() * 1e6, rnd.choice((0, 0, 0, 1)), "ok")
+        t0 = time.perf_counter()
+        for _ in range(n): add()
+        hot = time.perf_counter() - t0
+        h.close(timeout=120)
+        st = h.stats()
+        print(f"add(): {hot / n * 1e6:.2f} us/job (incl. row generation); {st['rows']} rows in "
+              f"{st['batches']} batches, written {n / (time.perf_counter() - t0):,.0f} rows/s")
+        conn = history.connect(h.path)
+        week = now - 7 * 86400
+        for label, q in (("slowest 20 this week", lambda: history.slowest(conn, week, limit=20)),
+                         ("slowest 20 make this week", lambda: history.slowest(conn, week, "make%", 20)),
+                         ("p95 of one command", lambda: history.quantile(conn, "npm test --shard 3", 0.95)),
+                         ("p95 of one command, week", lambda: history.quantile(conn, "npm test --shard 3", 0.95, week)),
+                         ("per-command summary, week", lambda: history.commands(conn, week))):
+            print(f"{label:<27}: {_best(q, repeat=3) * 1000:7.2f} ms")
+        conn.close()
+
+def bench_meter():
+    """Rate meter: cost per chunk (meter update, and counting the newlines), per stats read."""
+    import activity
+    for size in (64, 4096, 65536):
+        chunk = (b"x" * 79 + b"\n") * (size // 80) + b"x" * (size % 80)
+        m, t, lines = activity.RateMeter(), [0.0], chunk.count(b"\n")
+        def feed():
+            t[0] += 0.003
+            m.update(t[0], len(chunk), lines)
+        count = _best(lambda: chunk.count(b"\n"))
+        print(f"{size:>6} B chunks: update {_best(feed) * 1e9:5.0f} ns + line count {count * 1e9:6.0f} ns")
+    print(f"stats(): {_best(lambda: m.stats(t[0])) * 1e9:.0f} ns, "
+          f"sparkline(60): {_best(lambda: m.sparkline(t[0], 60)) * 1e6:.1f} us")
+
+def bench_vt():
+    """VT classifier throughput in 64 KiB chunks (the reader's size), and the class each workload gets, live and replayed."""
+    import json, os, tempfile, replay, vt
+    line = b"Compiling crate_name v1.2.3 (/src/crates/crate_name) -- some build output\r\n"
+    workloads = {
+        "plain build log": (line * 900, vt.CONTENT),
+        "colored log (SGR)": (b"\x1b[1;32m   Compiling\x1b[0m crate_name v1.2.3 (/src/crate_name)\r\n" * 1100,
+                              vt.CONTENT),
+        "ConPTY (ESC[K)": (b"Compiling crate_name v1.2.3 (/src/crate_name)\x1b[K\r\n" * 1100, vt.CONTENT),
+        "gcc colored": (b"\x1b[01m\x1b[Kfoo.c:3:1:\x1b[m\x1b[K \x1b[01;31m\x1b[Kerror: \x1b[m\x1b[K"
+                        b"expected ';' before '}' token\n" * 700, vt.CONTENT),
+        "grep --color": (b"\x1b[35m\x1b[Ksrc/main.c\x1b[m\x1b[K\x1b[36m\x1b[K:\x1b[m\x1b[K"
+                         b"\x1b[01;31m\x1b[Kmatch\x1b[m\x1b[K rest of the line\n" * 700, vt.CONTENT),
+        "progress bar (\\r)": (b"".join(b"\r[%-40s] %3d%%" % (b"=" * (i % 40), i % 100) for i in range(1300)),
+                               vt.REDRAW),
+        "spinner + title OSC": (b"".join(b"\x1b]0;pip %d\x07\x08%c" % (i, b"|/-\\"[i % 4]) for i in range(4000)),
+                                vt.REDRAW),
+        "docker multi-line": (b"".join(b"\x1b[3A" + b"".join(b"\x1b[2Klayer %d: %d%%\n" % (j, i % 100)
+                                                             for j in range(3)) for i in range(600)), vt.REDRAW),
+    }
+    failed = False
+    fd, path = tempfile.mkstemp(suffix=".cast")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"version": 2, "width": 80, "height": 24}) + "\n")
+        for i, (name, (data, want)) in enumerate(workloads.items()):
+            chunk = data[:64 * 1024]
+            c = vt.VtClassifier()
+            dt = _best(lambda: c.feed(chunk))
+            got = c.feed(chunk)
+            failed |= got != want
+            print(f"{name:>20}: {len(chunk) / dt / 1e6:8.1f} MB/s -> {got}{'' if got == want else f'  (want {want})'}")
+            f.write(json.dumps([float(i), "o", data[:4096].decode("utf-8", "surrogateescape")]) + "\n")
+    try:
+        out = replay.load_cast(path, detect_prompts=False)[0]
+    finally:
+        os.remove(path)
+    want = [float(i) for i, (_, cls) in enumerate(workloads.values()) if cls == vt.CONTENT]
+    failed |= out != want
+    print(f"{'replay':>20}: {len(out)} of {len(workloads)} chunks count as output (want {len(want)})")
+    if failed: sys.exit("vt check failed")
+
+def bench_prompts():
+    """Prompt detection: scan cost per chunk vs chunk size, prompt vs build-log lines, and stop latency (POSIX session)."""
+    import prompts, session
+    line = b"Compiling crate_name v1.2.3 (/src/crates/crate_name) -- some build output\r\n"
+    for size in (80, 4096, 65536):
+        chunk = (line * (size // len(line) + 1))[:size]
+        d = prompts.PromptDetector()
+        print(f"{size:>6} B chunk: {_best(lambda: d.feed(chunk)) * 1e6:5.1f} us/scan")
+    cases = [(b"[sudo] password for me: ", prompts.INPUT), (b"Enter passphrase for key '/home/me/.ssh/id': ", prompts.INPUT),
+             (b"Enter PIN: ", prompts.INPUT), (b"Continue? [Y/n] ", prompts.INPUT), (b"me@box:~$ ", prompts.PROMPT),
+             (b"(venv) me@box:~/src/app# ", prompts.PROMPT), (b"$ ", prompts.PROMPT), (b"Press any key to continue", prompts.INPUT),
+             (b"Are you sure you want to continue? ", prompts.INPUT),
+             (b"PS C:\\src> ", prompts.PROMPT)]
+    cases += [(line, None) for line in (b"Skipping: ", b"Mapping: ", b"Stopping: ", b"Shipping: ", b"Pinning: ",
+                                        b"  Downloading: ", b"Step 3/7 : ", b"   Compiling crate_name v1.2.3:",
+                                        b"Compress return values", b"test_continue_flag ... ok?",
+                                        b"lodash@4.17.21 /node_modules/lodash 100%", b"##")]   # build logs
+    wrong = [(line, kind) for line, kind in cases if prompts.PromptDetector().feed(line) != kind]
+    for line, kind in wrong: print(f"  {line!r}: want {kind}")
+    print(f"{len(cases) - len(wrong)} of {len(cases)} prompt / build-log lines classified right")
+    failed = bool(wrong)
+    for detect in (False, True):
+        start = []
+        _, sink = _run_session("stty -echo; echo building; sleep 0.3; printf 'me@box:~$ '; sleep 3.5",
+                               session.Settings(prompt_detect=detect), prepare=lambda s: start.append(time.perf_counter()))
+        t0 = start[0]
+        stop = [t for t, ms, _ in sink.events if ms == 320]
+        at = f"{(stop[0] - t0 - 0.3) * 1000:7.1f} ms after the prompt" if stop else "never"
+        print(f"prompt detection {'on ' if detect else 'off'}: stop beep {at}")
+    if failed: sys.exit("prompt check failed")
+
+def bench_marks():
+    """OSC 133 marks: parse cost per chunk, and chime latency after a failed command (POSIX session)."""
+    import session, shellmarks
+    line = b"Compiling crate_name v1.2.3 (/src/crates/crate_name) -- some build output\r\n"
+    chunk = (line * 56)[:4096]
+    colored = chunk.replace(b"Compiling", b"\x1b[32mCompiling\x1b[0m")[:4096]
+    for label, data in (("4 KiB plain", chunk), ("4 KiB colored", colored),
+                        ("4 KiB + D mark", chunk + b"\x1b]133;D;1\x07")):
+        p = shellmarks.MarkParser()
+        print(f"{label:<16}: {_best(lambda: p.feed(data)) * 1e6:5.2f} us/chunk")
+    script = (r"stty -echo; printf '\033]133;A\007$ \033]133;B\007'; sleep 0.2; printf '\033]133;C\007';"
+              r"echo building; sleep 1.2; printf '\033]133;D;2\007\033]133;A\007$ \033]133;B\007'; sleep 3.5")
+    for marks in (False, True):
+        ended = []
+        def prepare(sess):
+            on_output = sess._on_output
+            def watch(data, more):   # when the D mark reached the wrapper
+                if b"133;D;2" in data: ended.append(time.perf_counter())
+                on_output(data, more)
+            sess._on_output = watch
+        _, sink = _run_session(script, session.Settings(shell_marks=marks, prompt_detect=False), prepare=prepare)
+        chimes = {320: "stop", 460: "fail"}
+        got = [(t, chimes[ms]) for t, ms, _ in sink.events if ms in chimes]
+        at = f"{got[0][1]} chime {(got[0][0] - ended[0]) * 1000:7.1f} ms after the command ended" if got else "never"
+        print(f"shell marks {'on ' if marks else 'off'}: {at}")
+
+def bench_idle():
+    """Quiet deadline (POSIX session): timer wakeups while idle / while writing, stop latency."""
+    # Doubles as a check: exits non-zero if an idle child causes any wakeup or a stop is late.
+    import session
+    quiet, failed = 0.5, False
+    for name, cmd, expect in (
+            ("idle child, 2 s", "sleep 2", lambda w, n: w == 0),
+            ("200 lines over 2 s", "for i in $(seq 200); do echo line $i; sleep 0.01; done; sleep 1",
+             lambda w, n: w <= 2 / quiet + 2)):
+        late = []
+        def prepare(sess):
+            stop = sess._stop
+            def timed_stop(reason):
+                late.append(sess._loop.time() - (sess.detector.last_out + quiet))
+                stop(reason)
+            sess._stop = timed_stop
+        sess, _ = _run_session("stty -echo; " + cmd, session.Settings(quiet_sec=quiet, prompt_detect=False),
+                               prepare=prepare)
+        chunks = sess.vt.counts["content"]
+        ok = expect(sess.wakeups, chunks) and all(0 <= d < 0.005 for d in late)
+        failed |= not ok
+        lat = ", ".join(f"{d * 1000:.2f} ms" for d in late) or "-"
+        print(f"{name:>20}: {sess.wakeups} wakeups for {chunks} output chunks "
+              f"(50 ms polling: {int(2 / 0.05)} per 2 s), stop beep late by {lat}  {'ok' if ok else 'FAILED'}")
+    if failed: sys.exit("idle check failed")
+
+BENCHES = {
+    "synth": bench_synth,
+    "gain": bench_gain,
+    "wavetable": bench_wavetable,
+    "engine": bench_engine,
+    "input": bench_input,
+    "passthrough": bench_passthrough,
+    "session": bench_session,
+    "recorder": bench_recorder,
+    "replay": bench_replay,
+    "mux": bench_mux,
+    "meter": bench_meter,
+    "vt": bench_vt,
+    "prompts": bench_prompts,
+    "idle": bench_idle,
+    "activity": bench_activity,
+    "adaptive": bench_adaptive,
+    "marks": bench_marks,
+    "history": bench_history,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHES)
+    for name in names:
+        if name not in BENCHES:
+            sys.exit(f"unknown bench {name!r}; choose from: {', '.join(BENCHES)}")
+    for name in names:
+        print(f"== {name}: {BENCHES[name].__doc__}")
+        BENCHES[name]()
+        print()
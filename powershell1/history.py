@@ -0,0 +1,161 @@
+# history.py — job history in SQLite: one row per detected job, a performance log of daily work
+# - A job runs from its start (OSC 133 C, or the output that starts a writing spell) to its
+#   end (D mark, stop / input chime, or the child exiting)
+# - The session only appends a tuple; a writer thread (batchwriter.BatchWriter) inserts in
+#   batches, one transaction each
+# - Two covering indexes, (start, duration, command) and (command, duration, start): "slowest
+#   20 this week" and "p95 of npm test" never read the table for the rows they skip, so they
+#   stay in milliseconds at hundreds of thousands of rows
+#   python history.py [--db PATH] slowest [--since 7d] [--like 'make%'] [--limit 20]
+#   python history.py [--db PATH] quantile "npm test" [--q 0.95] [--since 30d]
+#   python history.py [--db PATH] commands [--since 7d]        -> runs / mean / max per command
+import argparse, os, re, sqlite3, sys, time
+import tones
+from batchwriter import BatchWriter
+
+DEFAULT_PATH = os.path.join(os.path.dirname(tones.default_cache_dir()), "history.sqlite")
+
+COLUMNS = ("session", "command", "start_wall", "end_wall", "start_mono", "end_mono", "duration",
+           "bytes", "lines", "peak_bps", "exit", "ended")
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id         INTEGER PRIMARY KEY,
+    session    TEXT,
+    command    TEXT NOT NULL,
+    start_wall REAL NOT NULL,      -- time.time()
+    end_wall   REAL NOT NULL,
+    start_mono REAL NOT NULL,      -- time.monotonic(), the loop clock
+    end_mono   REAL NOT NULL,
+    duration   REAL NOT NULL,      -- sec, from the monotonic times
+    bytes      INTEGER NOT NULL,   -- output during the job
+    lines      INTEGER NOT NULL,
+    peak_bps   REAL NOT NULL,      -- highest output rate (RateMeter bytes/s)
+    exit       INTEGER,            -- exit code from an OSC 133 D mark, NULL if unknown
+    ended      TEXT NOT NULL       -- ok | fail | quiet | prompt | input | exit
+);
+CREATE INDEX IF NOT EXISTS jobs_start ON jobs (start_wall, duration, command);
+CREATE INDEX IF NOT EXISTS jobs_command ON jobs (command, duration, start_wall);
+"""
+
+def connect(path=DEFAULT_PATH) -> sqlite3.Connection:
+    """Open (creating if needed) a history database."""
+    if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")    # readers (the CLI) don't block the writer
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+class History(BatchWriter):
+    """Buffered job writer. add() is cheap and never touches the disk."""
+    FLUSH_SEC = 1.0      # batch window after the first job of a burst
+    _SQL = f"INSERT INTO jobs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._conn = None
+        self.rows = self.batches = self.errors = 0
+        super().__init__("history")
+
+    def add(self, session, command, start_wall, start_mono, end_mono, nbytes, nlines, peak_bps,
+            exit=None, ended="quiet"):
+        """One finished job; the wall end time is derived from the monotonic duration."""
+        duration = max(0.0, end_mono - start_mono)
+        row = (session, command, start_wall, start_wall + duration, start_mono, end_mono, duration,
+               nbytes, nlines, peak_bps, exit, ended)
+        self._put(row)
+
+    def _writer_start(self):
+        try:
+            self._conn = connect(self.path)
+        except (OSError, sqlite3.Error):
+            pass   # history is best-effort: jobs are dropped, the session goes on
+
+    def _write_batch(self, batch):
+        if self._conn is None: return
+        try:
+            with self._conn: self._conn.executemany(self._SQL, batch)   # one transaction per burst
+            self.rows += len(batch)
+            self.batches += 1
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _writer_done(self):
+        if self._conn is not None: self._conn.close()
+
+    def stats(self) -> dict:
+        return {"path": self.path, "rows": self.rows, "batches": self.batches, "pending": self.pending,
+                "errors": self.errors}
+
+# ===================== Queries =====================
+def slowest(conn, since=None, like=None, limit=20) -> list:
+    """The `limit` longest jobs started after `since` (wall time), optionally with command LIKE `like`."""
+    where, args = ["start_wall >= ?"], [since or 0.0]
+    if like: where.append("command LIKE ?"); args.append(like)
+    # The inner query is answered from jobs_start alone; only `limit` rows are read from the table.
+    return conn.execute(f"SELECT command, start_wall, duration, bytes, lines, peak_bps, exit, ended "
+                        f"FROM jobs WHERE id IN (SELECT id FROM jobs INDEXED BY jobs_start "
+                        f"WHERE {' AND '.join(where)} ORDER BY duration DESC LIMIT ?) "
+                        f"ORDER BY duration DESC", args + [limit]).fetchall()
+
+def quantile(conn, command, q=0.95, since=None):
+    """The q-quantile of `command`'s duration (sec; nearest rank), None if it never ran.
+
+    Both steps read only the (command, duration, start_wall) index.
+    """
+    args = (command, since or 0.0)
+    n = conn.execute("SELECT count(*) FROM jobs WHERE command = ? AND start_wall >= ?", args).fetchone()[0]
+    if not n: return None
+    k = min(n - 1, max(0, int(q * n + 0.5) - 1))
+    return conn.execute("SELECT duration FROM jobs WHERE command = ? AND start_wall >= ? "
+                        "ORDER BY duration LIMIT 1 OFFSET ?", args + (k,)).fetchone()[0]
+
+def commands(conn, since=None, limit=50) -> list:
+    """(command, runs, mean sec, max sec) for the most-run commands since `since` (from jobs_start)."""
+    return conn.execute("SELECT command, count(*), avg(duration), max(duration) FROM jobs INDEXED BY jobs_start "
+                        "WHERE start_wall >= ? GROUP BY command ORDER BY count(*) DESC LIMIT ?",
+                        (since or 0.0, limit)).fetchall()
+
+def _since(spec):
+    """"7d" / "12h" / "30m" / "90s" -> wall time that long ago; None for None."""
+    if spec is None: return None
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)([smhdw])", spec.strip())
+    if not m: raise argparse.ArgumentTypeError(f"bad duration {spec!r} (e.g. 7d, 12h, 30m)")
+    unit = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}[m.group(2)]
+    return time.time() - float(m.group(1)) * unit
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Query the job history the wrapper writes (index.py --history / --history-db).")
+    ap.add_argument("--db", default=os.environ.get("JOBS_HISTORY") or DEFAULT_PATH, help="history database")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("slowest", help="longest jobs")
+    p.add_argument("--since", type=_since, default=_since("7d"), help="e.g. 7d, 12h (default: 7d)")
+    p.add_argument("--like", help="SQL LIKE pattern on the command line, e.g. 'make%%'")
+    p.add_argument("--limit", type=int, default=20)
+    p = sub.add_parser("quantile", help="duration quantile of one command")
+    p.add_argument("command")
+    p.add_argument("--q", type=float, default=0.95)
+    p.add_argument("--since", type=_since)
+    p = sub.add_parser("commands", help="runs / mean / max per command")
+    p.add_argument("--since", type=_since, default=_since("7d"))
+    p.add_argument("--limit", type=int, default=50)
+    a = ap.parse_args(argv)
+
+    conn = connect(a.db)
+    t0 = time.perf_counter()
+    if a.cmd == "slowest":
+        for cmd, start, dur, nbytes, nlines, peak, code, ended in slowest(conn, a.since, a.like, a.limit):
+            status = ended if code is None else f"{ended} ({code})"
+            print(f"{dur:9.1f} s  {time.strftime('%Y-%m-%d %H:%M', time.localtime(start))}  "
+                  f"{nbytes / 1024:9.0f} KB {nlines:>7} lines  peak {peak / 1024:7.0f} KB/s  {status:<10} {cmd}")
+    elif a.cmd == "quantile":
+        v = quantile(conn, a.command, a.q, a.since)
+        print("never ran" if v is None else f"p{a.q * 100:g} {v:.2f} s")
+    else:
+        for cmd, runs, mean, top in commands(conn, a.since, a.limit):
+            print(f"{runs:>6} runs  mean {mean:8.1f} s  max {top:8.1f} s  {cmd}")
+    print(f"# {(time.perf_counter() - t0) * 1000:.1f} ms", file=sys.stderr)
+    conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,156 +1,90 @@
-# index.py — PowerShell ConPTY wrapper with GUI + per-sound volume
+# index.py — shell wrapper (PowerShell via ConPTY, or any command on a POSIX pty) with GUI + per-sound volume
 # - Continuous short tick while output flows
-# - Low stop beep after QUIET_SEC of silence
+# - Low stop beep after QUIET_SEC of silence, or at once when a prompt shows
+#   (a rising chime instead when the child asks for input)
 # - GUI: Mute, Master Volume, Running Tick Volume, Stop Beep Volume, all other tuning
-from winpty import PtyProcess
-import threading, time, sys, msvcrt, signal, struct, math, winsound, tempfile, os
-
-# ===================== Shared state (GUI <-> workers) =====================
-mute = False
-master_volume_pct = 60   # 0..100
-run_volume_pct    = 50   # 0..100  (ticks)
-stop_volume_pct   = 70   # 0..100  (stop tones)
-state_lock = threading.Lock()
-
-# --- defaults (tweak in GUI) ---
-QUIET_SEC = 3.0             # silence window before stop beep
-RUN_BEEP_FREQ = 600         # Hz while bytes are flowing
-RUN_BEEP_MS   = 30          # ms each running tick
-RUN_BEEP_GAP  = 120         # ms gap between ticks
-STOP_BEEP_1   = (440, 160)  # (Hz, ms) first stop tone
-STOP_BEEP_2   = (330, 160)  # second stop tone (set to None to disable)
-
-# ===================== Tone synth with volume (no extra deps) =====================
-def _wav_bytes(freq_hz: int, dur_ms: int, vol_pct: int, sample_rate=44100) -> bytes:
-    n = max(1, int(sample_rate * (dur_ms / 1000.0)))
-    vol = max(0, min(vol_pct, 100)) / 100.0
-    amp = int(32767 * vol)
-    frames = bytearray()
-    w = 2.0 * math.pi * float(freq_hz)
-    for i in range(n):
-        s = int(amp * math.sin(w * (i / sample_rate)))
-        frames += struct.pack("<h", s)
-    data = bytes(frames)
-    sub2 = len(data)
-    chunk = 36 + sub2
-    byte_rate = sample_rate * 2  # 16-bit mono
-    hdr = struct.pack(
-        "<4sI4s4sIHHIIHH4sI",
-        b"RIFF", chunk, b"WAVE",
-        b"fmt ", 16, 1, 1, sample_rate, byte_rate, 2, 16,
-        b"data", sub2
-    )
-    return hdr + data
-
-def _effective_volume(per_sound_pct: int) -> int:
-    """Combine master + per-sound volume, clamp 0..100."""
-    with state_lock:
-        if mute: return 0
-        m = master_volume_pct
-    eff = int(max(0, min(100, (m * per_sound_pct) / 100)))
-    return eff
-
-def _play_wav_async(wav: bytes, dur_ms: int):
-    """Play a WAV safely in a background thread."""
-    def _worker():
-        try:
-            winsound.PlaySound(wav, winsound.SND_MEMORY)  # sync in this thread
-        except Exception:
-            # Fallback: temp file + async
-            try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as f:
-                    f.write(wav)
-                    path = f.name
-                winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
-                time.sleep(dur_ms / 1000.0 + 0.05)
-                try: os.remove(path)
-                except OSError: pass
-            except Exception:
-                winsound.MessageBeep(-1)
-    threading.Thread(target=_worker, daemon=True).start()
-
-def play_tick(freq, dur_ms):
-    """Running tick (uses run_volume_pct)."""
-    vol = _effective_volume(run_volume_pct)
-    if vol <= 0 or dur_ms <= 0 or freq <= 0: return
-    _play_wav_async(_wav_bytes(int(freq), int(dur_ms), vol), int(dur_ms))
-
-def play_stop_beeps():
-    """Stop tones (use stop_volume_pct)."""
-    vol = _effective_volume(stop_volume_pct)
-    if vol <= 0: return
-    with state_lock:
-        sb1 = STOP_BEEP_1
-        sb2 = STOP_BEEP_2
-    if sb1:
-        _play_wav_async(_wav_bytes(int(sb1[0]), int(sb1[1]), vol), int(sb1[1]))
-        if sb2: time.sleep(0.05)
-    if sb2:
-        _play_wav_async(_wav_bytes(int(sb2[0]), int(sb2[1]), vol), int(sb2[1]))
-
-# ===================== ConPTY wrapper (PowerShell inside) =====================
-proc = PtyProcess.spawn("powershell.exe")
-writing = False
-last_out = time.time()
-alive = True
-
-def reader():
-    """Mirror child output; mark 'writing' when bytes arrive."""
-    global writing, last_out, alive
-    try:
-        while proc.isalive():
-            chunk = proc.read(4096)  # str
-            if not chunk:
-                break
-            sys.stdout.write(chunk)
-            sys.stdout.flush()
-            writing = True
-            last_out = time.time()
-    finally:
-        alive = False
-
-def writer():
-    """Forward keystrokes to the child shell."""
-    while alive and proc.isalive():
-        if msvcrt.kbhit():
-            ch = msvcrt.getwch()
-            if ch == '\x03':  # Ctrl+C
-                proc.write('\x03'); continue
-            if ch == '\r':   # Enter -> CRLF
-                proc.write('\r\n'); continue
-            proc.write(ch)
-        else:
-            time.sleep(0.01)
-
-def idle_watcher():
-    """If quiet for QUIET_SEC, play stop beep and drop to not-writing."""
-    global writing
-    while alive:
-        with state_lock: q = QUIET_SEC
-        if writing and (time.time() - last_out) >= q:
-            writing = False
-            play_stop_beeps()
-        time.sleep(0.05)
-
-def running_beeper():
-    """Emit periodic ticks while 'writing' is True."""
-    while alive:
-        if writing:
-            with state_lock:
-                f = RUN_BEEP_FREQ
-                ms = RUN_BEEP_MS
-                gap = RUN_BEEP_GAP
-            play_tick(f, ms)
-            time.sleep(max(0.0, gap / 1000.0))
-        else:
-            time.sleep(0.05)
-
-def sigint(_sig, _frm):
-    try:
-        proc.write('\x03')
-    except Exception:
-        pass
-signal.signal(signal.SIGINT, sigint)
+# - Optional asciicast v2 recording of the session (--record PATH)
+# - Background jobs (--job CMD, repeatable) beside the shell, each ticking at its own pitch
+# - Optional job history in SQLite (--history, --history-db PATH): duration, output volume, exit code per job;
+#   query it with history.py
+#   python index.py [--audio SINK] [--no-gui] [--record PATH] [--history] [--history-db PATH] [--job CMD ...] [--headless] [command ...]
+#   (default command: powershell.exe / $SHELL)
+import time
+from sounds import timing_log   # first: its clock marks process start for the timing log
+import argparse, asyncio, shlex, threading, sys, signal, os
+import audio, history, mux, recorder, session, terminal, vt
+
+ap = argparse.ArgumentParser(description="Beep while a shell is writing output, chime when it stops.")
+ap.add_argument("--audio", default=os.environ.get("JOBS_AUDIO"),
+                help="sound sink: winsound | pipe[:pacat|:aplay] | wav:PATH | null (default: per OS)")
+ap.add_argument("--no-gui", action="store_true", help="run without the Beep Controls window")
+ap.add_argument("--record", metavar="PATH", default=os.environ.get("JOBS_RECORD"),
+                help="record output, keys and beeps to an asciicast v2 file")
+ap.add_argument("--record-max-mb", type=float, default=64, help="rotate the recording past this size")
+ap.add_argument("--history", action="store_true",
+                help="log every job (command, duration, output, exit code) to SQLite")
+ap.add_argument("--history-db", metavar="PATH", default=os.environ.get("JOBS_HISTORY"),
+                help=f"history database; implies --history (default: {history.DEFAULT_PATH})")
+ap.add_argument("--count", default=vt.CONTENT, metavar="CLASSES",
+                help="output that counts as activity: " + ",".join(vt.CLASSES) + " (default: content)")
+ap.add_argument("--no-prompts", action="store_true",
+                help="always wait out the quiet window (no instant stop on a prompt / input request)")
+ap.add_argument("--adaptive", action="store_true",
+                help="learn the silence before the stop beep from each job's own output gaps")
+ap.add_argument("--quiet-min", type=float, default=1.0, metavar="SEC", help="shortest learned silence")
+ap.add_argument("--quiet-max", type=float, default=15.0, metavar="SEC", help="longest learned silence")
+ap.add_argument("--min-burst", type=float, default=0.0, metavar="SEC",
+                help="output must go on this long before ticks start (one-off repaints stay silent)")
+ap.add_argument("--hysteresis", type=float, metavar="SEC",
+                help="a gap this long breaks a burst still short of --min-burst (default: the quiet window)")
+ap.add_argument("--debounce", type=float, default=0.0, metavar="SEC",
+                help="ignore output this long after a stop beep")
+ap.add_argument("--shell-marks", action="store_true",
+                help="set bash / PowerShell up to mark each command's start and exit code (OSC 133): "
+                     "chimes come the moment a command ends, a failure sounds different")
+ap.add_argument("--job", action="append", default=[], metavar="CMD",
+                help="also watch CMD as a background job (no keyboard, output hidden)")
+ap.add_argument("--job-quiet", type=float, metavar="SEC", help="silence before a job's stop beep")
+ap.add_argument("--headless", action="store_true", help="no interactive shell: watch the --job commands only")
+ap.add_argument("command", nargs=argparse.REMAINDER, help="command to wrap")
+args = ap.parse_args()
+if args.command[:1] == ["--"]: args.command = args.command[1:]
+
+# ===================== Settings (GUI <-> session) =====================
+# Defaults live in session.Settings (tweak in GUI); the GUI edits them under settings.lock.
+settings = session.Settings(activity=tuple(args.count.split(",")), prompt_detect=not args.no_prompts,
+                            min_burst=args.min_burst, hysteresis=args.hysteresis, debounce=args.debounce,
+                            adaptive=args.adaptive, quiet_min=args.quiet_min, quiet_max=args.quiet_max)
+
+# ===================== Sounds =====================
+# Rendering lives in tones.py. tones.tone_cache synthesizes each tone once at full scale and
+# applies volume as a gain stage, so slider moves never re-synthesize and steady-state ticks
+# are a dict lookup. One worker owns the device; ticks that pile up behind a busy device are
+# coalesced. --audio / JOBS_AUDIO picks the sink (winsound | pipe | wav:PATH | null), see
+# audio.open_sink.
+engine = audio.AudioEngine(audio.open_sink(args.audio), maxlen=8, policy=audio.COALESCE).start()
+
+# ===================== Terminal wrapper (PowerShell / shell inside, plus jobs) =====================
+# Every session runs on one event loop and shares the engine and tone cache (see mux.py).
+jobs_db = history.History(args.history_db or history.DEFAULT_PATH) if args.history or args.history_db else None
+sessions = mux.Multiplexer(settings, engine, history=jobs_db)
+rec = None
+if not args.headless:
+    if args.record:
+        cols, rows = os.get_terminal_size() if sys.stdout.isatty() else (80, 24)
+        rec = recorder.Recorder(args.record, cols, rows, " ".join(args.command or terminal.DEFAULT_COMMAND),
+                                max_bytes=int(args.record_max_mb * 1024 * 1024))
+    t_spawn = time.perf_counter()
+    sessions.add(args.command, console=True, recorder=rec, marks=args.shell_marks)
+    timing_log(f"spawn {' '.join(args.command or terminal.DEFAULT_COMMAND)}: "
+               f"{(time.perf_counter() - t_spawn) * 1000:.1f} ms")
+for job in args.job:
+    sessions.add(shlex.split(job, posix=(sys.platform != "win32")), name=job, quiet_sec=args.job_quiet,
+                 marks=args.shell_marks)
+if not sessions.sessions: ap.error("--headless needs at least one --job")
+sounds = sessions.sessions[0].sounds   # GUI test buttons / stats
+sessions.warm_up()
+signal.signal(signal.SIGINT, lambda _sig, _frm: sessions.interrupt())
 
 # ===================== GUI =====================
 def start_gui():
@@ -166,15 +100,13 @@ def start_gui():
     # Mute + Master Volume
     mute_var = tk.BooleanVar(value=False)
     def on_mute():
-        global mute
-        with state_lock: mute = bool(mute_var.get())
+        with settings.lock: settings.mute = bool(mute_var.get())
     ttk.Checkbutton(main, text="Mute", variable=mute_var, command=on_mute).grid(row=0, column=0, sticky="w")
 
     ttk.Label(main, text="Master Volume:").grid(row=0, column=1, sticky="e")
-    mvol_var = tk.IntVar(value=master_volume_pct)
+    mvol_var = tk.IntVar(value=settings.master_volume)
     def on_mvol(_=None):
-        global master_volume_pct
-        with state_lock: master_volume_pct = int(mvol_var.get())
+        with settings.lock: settings.master_volume = int(mvol_var.get())
     mvol = ttk.Scale(main, from_=0, to=100, orient="horizontal", variable=mvol_var, command=lambda _v: on_mvol())
     grid(mvol, 0, 2, sticky="ew"); main.grid_columnconfigure(2, weight=1)
 
@@ -183,86 +115,173 @@ def start_gui():
     ttk.Label(main, text="Running tick (while output flows)").grid(row=2, column=0, columnspan=4, sticky="w")
 
     ttk.Label(main, text="Tick Volume:").grid(row=3, column=0, sticky="e")
-    rvol_var = tk.IntVar(value=run_volume_pct)
+    rvol_var = tk.IntVar(value=settings.run_volume)
     def on_rvol(_=None):
-        global run_volume_pct
-        with state_lock: run_volume_pct = int(rvol_var.get())
+        with settings.lock: settings.run_volume = int(rvol_var.get())
     rvol = ttk.Scale(main, from_=0, to=100, orient="horizontal", variable=rvol_var, command=lambda _v: on_rvol())
     grid(rvol, 3, 1, sticky="ew")
 
     ttk.Label(main, text="Freq (Hz):").grid(row=4, column=0, sticky="e")
-    rf_var = tk.IntVar(value=RUN_BEEP_FREQ)
+    rf_var = tk.IntVar(value=settings.run_freq)
     rf_spin = ttk.Spinbox(main, from_=100, to=4000, increment=10, textvariable=rf_var, width=8); grid(rf_spin, 4, 1)
 
     ttk.Label(main, text="Dur (ms):").grid(row=5, column=0, sticky="e")
-    rms_var = tk.IntVar(value=RUN_BEEP_MS)
+    rms_var = tk.IntVar(value=settings.run_ms)
     rms_spin = ttk.Spinbox(main, from_=5, to=500, increment=5, textvariable=rms_var, width=8); grid(rms_spin, 5, 1)
 
     ttk.Label(main, text="Gap (ms):").grid(row=6, column=0, sticky="e")
-    rgap_var = tk.IntVar(value=RUN_BEEP_GAP)
+    rgap_var = tk.IntVar(value=settings.run_gap)
     rgap_spin = ttk.Spinbox(main, from_=20, to=2000, increment=10, textvariable=rgap_var, width=8); grid(rgap_spin, 6, 1)
 
+    stream_var = tk.BooleanVar(value=settings.tick_stream)
+    ttk.Checkbutton(main, text="Stream ticks", variable=stream_var).grid(row=6, column=2, sticky="w")
+
     def apply_run():
-        global RUN_BEEP_FREQ, RUN_BEEP_MS, RUN_BEEP_GAP
-        with state_lock:
-            RUN_BEEP_FREQ = int(rf_var.get())
-            RUN_BEEP_MS   = int(rms_var.get())
-            RUN_BEEP_GAP  = int(rgap_var.get())
+        new = dict(run_freq=int(rf_var.get()), run_ms=int(rms_var.get()), run_gap=int(rgap_var.get()),
+                   tick_stream=bool(stream_var.get()))
+        def stale(old):
+            old = (old["run_freq"], old["run_ms"])
+            return [old] if old != (new["run_freq"], new["run_ms"]) else []
+        sessions.warm_up("apply run", stale, changes=new)   # assigned once the new tick is rendered
     ttk.Button(main, text="Apply", command=apply_run).grid(row=7, column=2, sticky="w")
-    ttk.Button(main, text="Test Tick", command=lambda: play_tick(rf_var.get(), rms_var.get())).grid(row=7, column=0, sticky="w")
+    ttk.Button(main, text="Test Tick", command=lambda: sounds.play_tick(rf_var.get(), rms_var.get())).grid(row=7, column=0, sticky="w")
 
     # Stop beep controls
     ttk.Separator(main, orient="horizontal").grid(row=8, column=0, columnspan=4, sticky="ew", pady=4)
     ttk.Label(main, text="Stop beep(s) after silence").grid(row=9, column=0, columnspan=4, sticky="w")
 
     ttk.Label(main, text="Stop Volume:").grid(row=10, column=0, sticky="e")
-    svol_var = tk.IntVar(value=stop_volume_pct)
+    svol_var = tk.IntVar(value=settings.stop_volume)
     def on_svol(_=None):
-        global stop_volume_pct
-        with state_lock: stop_volume_pct = int(svol_var.get())
+        with settings.lock: settings.stop_volume = int(svol_var.get())
     svol = ttk.Scale(main, from_=0, to=100, orient="horizontal", variable=svol_var, command=lambda _v: on_svol())
     grid(svol, 10, 1, sticky="ew")
 
     ttk.Label(main, text="Stop #1 Freq:").grid(row=11, column=0, sticky="e")
-    s1f_var = tk.IntVar(value=STOP_BEEP_1[0]); s1f_spin = ttk.Spinbox(main, from_=100, to=4000, increment=10, textvariable=s1f_var, width=8); grid(s1f_spin, 11, 1)
+    s1f_var = tk.IntVar(value=settings.stop_1[0]); s1f_spin = ttk.Spinbox(main, from_=100, to=4000, increment=10, textvariable=s1f_var, width=8); grid(s1f_spin, 11, 1)
     ttk.Label(main, text="Stop #1 Dur:").grid(row=12, column=0, sticky="e")
-    s1d_var = tk.IntVar(value=STOP_BEEP_1[1]); s1d_spin = ttk.Spinbox(main, from_=20, to=2000, increment=10, textvariable=s1d_var, width=8); grid(s1d_spin, 12, 1)
+    s1d_var = tk.IntVar(value=settings.stop_1[1]); s1d_spin = ttk.Spinbox(main, from_=20, to=2000, increment=10, textvariable=s1d_var, width=8); grid(s1d_spin, 12, 1)
 
-    enable_s2 = tk.BooleanVar(value=STOP_BEEP_2 is not None)
+    enable_s2 = tk.BooleanVar(value=settings.stop_2 is not None)
     ttk.Checkbutton(main, text="Enable Stop #2", variable=enable_s2).grid(row=13, column=0, sticky="w")
     ttk.Label(main, text="Stop #2 Freq:").grid(row=14, column=0, sticky="e")
-    s2f_var = tk.IntVar(value=(STOP_BEEP_2[0] if STOP_BEEP_2 else 330)); s2f_spin = ttk.Spinbox(main, from_=100, to=4000, increment=10, textvariable=s2f_var, width=8); grid(s2f_spin, 14, 1)
+    s2f_var = tk.IntVar(value=(settings.stop_2[0] if settings.stop_2 else 330)); s2f_spin = ttk.Spinbox(main, from_=100, to=4000, increment=10, textvariable=s2f_var, width=8); grid(s2f_spin, 14, 1)
     ttk.Label(main, text="Stop #2 Dur:").grid(row=15, column=0, sticky="e")
-    s2d_var = tk.IntVar(value=(STOP_BEEP_2[1] if STOP_BEEP_2 else 160)); s2d_spin = ttk.Spinbox(main, from_=20, to=2000, increment=10, textvariable=s2d_var, width=8); grid(s2d_spin, 15, 1)
+    s2d_var = tk.IntVar(value=(settings.stop_2[1] if settings.stop_2 else 160)); s2d_spin = ttk.Spinbox(main, from_=20, to=2000, increment=10, textvariable=s2d_var, width=8); grid(s2d_spin, 15, 1)
 
     ttk.Label(main, text="Silence before stop (sec):").grid(row=16, column=0, sticky="e")
-    q_var = tk.DoubleVar(value=QUIET_SEC)
+    q_var = tk.DoubleVar(value=settings.quiet_sec)
     q_spin = ttk.Spinbox(main, from_=0.2, to=10.0, increment=0.1, textvariable=q_var, width=8); grid(q_spin, 16, 1)
+    # Which output counts as activity (vt.py): new text always; redraws / control-only optional
+    redraw_var = tk.BooleanVar(value=vt.REDRAW in settings.activity)
+    ttk.Checkbutton(main, text="Redraws count", variable=redraw_var).grid(row=15, column=2, sticky="w")
+    control_var = tk.BooleanVar(value=vt.CONTROL in settings.activity)
+    ttk.Checkbutton(main, text="Control-only counts", variable=control_var).grid(row=16, column=2, sticky="w")
+    prompt_var = tk.BooleanVar(value=settings.prompt_detect)
+    ttk.Checkbutton(main, text="Stop at once on a prompt", variable=prompt_var).grid(row=14, column=2, sticky="w")
+    marks_var = tk.BooleanVar(value=settings.shell_marks)
+    ttk.Checkbutton(main, text="Follow shell marks (OSC 133)", variable=marks_var).grid(row=13, column=2, sticky="w")
+    # Learned silence: multiple x p99 of the output gaps, within min..max (activity.AdaptiveQuiet)
+    adaptive_var = tk.BooleanVar(value=settings.adaptive)
+    ttk.Checkbutton(main, text="Learn silence from output gaps", variable=adaptive_var).grid(row=11, column=2, sticky="w")
+    adapt_frm = ttk.Frame(main); adapt_frm.grid(row=12, column=2, sticky="w")
+    qmin_var, qmax_var = tk.DoubleVar(value=settings.quiet_min), tk.DoubleVar(value=settings.quiet_max)
+    qmul_var = tk.DoubleVar(value=settings.quiet_multiple)
+    for c, (text, var, lo, hi) in enumerate((("min", qmin_var, 0.2, 60.0), ("max", qmax_var, 0.2, 60.0),
+                                              (f"x p{settings.quiet_quantile * 100:g}", qmul_var, 1.0, 10.0))):
+        ttk.Label(adapt_frm, text=text).grid(row=0, column=2 * c, sticky="e")
+        ttk.Spinbox(adapt_frm, from_=lo, to=hi, increment=0.1, textvariable=var, width=5).grid(row=0, column=2 * c + 1, padx=(2, 6))
 
     def apply_stop():
-        global STOP_BEEP_1, STOP_BEEP_2, QUIET_SEC
-        with state_lock:
-            STOP_BEEP_1 = (int(s1f_var.get()), int(s1d_var.get()))
-            STOP_BEEP_2 = (int(s2f_var.get()), int(s2d_var.get())) if enable_s2.get() else None
-            QUIET_SEC   = float(q_var.get())
+        new = dict(
+            stop_1    = (int(s1f_var.get()), int(s1d_var.get())),
+            stop_2    = (int(s2f_var.get()), int(s2d_var.get())) if enable_s2.get() else None,
+            quiet_sec = float(q_var.get()),
+            prompt_detect = bool(prompt_var.get()),
+            shell_marks = bool(marks_var.get()),
+            adaptive  = bool(adaptive_var.get()),
+            quiet_min = float(qmin_var.get()), quiet_max = float(qmax_var.get()),
+            quiet_multiple = float(qmul_var.get()),
+            activity  = (vt.CONTENT,) + ((vt.REDRAW,) if redraw_var.get() else ())
+                                      + ((vt.CONTROL,) if control_var.get() else ()))
+        stale = lambda old: {old["stop_1"], old["stop_2"]} - {new["stop_1"], new["stop_2"], None}
+        sessions.warm_up("apply stop", stale, changes=new)   # assigned once the new chime is rendered
     ttk.Button(main, text="Apply", command=apply_stop).grid(row=17, column=2, sticky="w")
-    ttk.Button(main, text="Test Stop Beep", command=play_stop_beeps).grid(row=17, column=0, sticky="w")
+    ttk.Button(main, text="Test Stop Beep", command=sounds.play_stop).grid(row=17, column=0, sticky="w")
+    ttk.Button(main, text="Test Fail Beep", command=sounds.play_fail).grid(row=17, column=1, sticky="w")
+
+    # Tone cache stats
+    ttk.Separator(main, orient="horizontal").grid(row=18, column=0, columnspan=4, sticky="ew", pady=4)
+    cache_var = tk.StringVar()
+    ttk.Label(main, textvariable=cache_var).grid(row=19, column=0, columnspan=4, sticky="w")
+    engine_var = tk.StringVar()
+    ttk.Label(main, textvariable=engine_var).grid(row=20, column=0, columnspan=4, sticky="w")
+    def refresh_stats():
+        stats = sounds.stats()
+        st = stats["tones"]
+        cache_var.set(f"Tone cache: {st['hits']} hits / {st['misses']} misses ({st['renders']} synth), "
+                      f"{st['entries']} tones, {st['bytes'] // 1024}/{st['max_bytes'] // 1024} KB")
+        st = stats["audio"]
+        engine_var.set(f"Audio queue: {st['depth']}/{st['maxlen']} (peak {st['max_depth']}), "
+                       f"{st['played']} played, {st['streamed']} streamed, "
+                       f"{st['coalesced']} coalesced, {st['dropped']} dropped")
+        now = time.monotonic()
+        for sess, var, rate_var, spark_var in tab_vars:
+            st = sess.status()
+            state = "writing" if st["writing"] else ("quiet" if st["alive"] else "exited")
+            if st["marks"] is not None:   # stop / fail chimes come from the shell's marks
+                state += f", {'command running' if st['command'] else 'at the prompt'} (marked)"
+            a = st["adaptive"]
+            if sess.quiet_sec is not None or not settings.adaptive: how = ""
+            elif a["learned"]: how = f" (learned: {a['gaps']} gaps, p{a['quantile'] * 100:g} {a['gap_sec']:.2f} s)"
+            else: how = f" (learning: {a['gaps']} gaps so far)"
+            var.set(f"{state}, tick {int(round(settings.run_freq * st['pitch']))} Hz, "
+                    f"stop after {st['quiet_sec']:.2f} s quiet{how}")
+            r = st["rate"]
+            idle = "" if r["idle_sec"] is None else f", last output {r['idle_sec']:.1f} s ago"
+            rate_var.set(f"{r['bytes_per_sec'] / 1024:.1f} KB/s, {r['lines_per_sec']:.1f} lines/s, "
+                         f"{r['bursts']} bursts, {r['total_bytes'] // 1024} KB / {r['total_lines']} lines{idle}")
+            spark_var.set(sess.meter.sparkline(now, 60))
+        root.after(1000, refresh_stats)
+
+    # One tab per session: state, its own quiet window, its pitch
+    tabs = ttk.Notebook(main)
+    tabs.grid(row=21, column=0, columnspan=4, sticky="ew", pady=4)
+    tab_vars = []
+    for sess in sessions.sessions:
+        tab = ttk.Frame(tabs, padding=6)
+        tabs.add(tab, text=("* " if sess.console else "") + sess.name[:24])
+        var, rate_var, spark_var = tk.StringVar(), tk.StringVar(), tk.StringVar()
+        ttk.Label(tab, textvariable=var).grid(row=0, column=0, columnspan=4, sticky="w")
+        ttk.Label(tab, textvariable=rate_var).grid(row=2, column=0, columnspan=4, sticky="w")
+        ttk.Label(tab, textvariable=spark_var, font=("TkFixedFont", 10)).grid(row=3, column=0, columnspan=4, sticky="w")
+        tab_vars.append((sess, var, rate_var, spark_var))
+        ttk.Label(tab, text="Silence before stop (sec):").grid(row=1, column=0, sticky="e")
+        sq_var = tk.StringVar(value="" if sess.quiet_sec is None else f"{sess.quiet_sec:g}")
+        grid(ttk.Spinbox(tab, from_=0.2, to=60.0, increment=0.1, textvariable=sq_var, width=8), 1, 1)
+        def apply_quiet(sess=sess, sq_var=sq_var):
+            v = sq_var.get().strip()
+            sess.quiet_sec = float(v) if v else None   # blank: follow the global setting
+        ttk.Button(tab, text="Apply", command=apply_quiet).grid(row=1, column=2, sticky="w")
+        ttk.Button(tab, text="Test Tick",
+                   command=lambda sess=sess: sess.sounds.play_tick(rf_var.get(), rms_var.get())).grid(row=1, column=3, sticky="w")
+    refresh_stats()
 
     root.protocol("WM_DELETE_WINDOW", root.destroy)
     root.mainloop()
 
-# ===================== Start worker threads =====================
-threads = [
-    threading.Thread(target=reader, daemon=True),
-    threading.Thread(target=writer, daemon=True),
-    threading.Thread(target=idle_watcher, daemon=True),
-    threading.Thread(target=running_beeper, daemon=True),
-]
-for t in threads: t.start()
-
 # ===================== Start GUI (non-blocking) =====================
-gui_thread = threading.Thread(target=start_gui, daemon=True)
-gui_thread.start()
-
-# Wait for child to exit
-threads[0].join()
+if not args.no_gui:
+    gui_thread = threading.Thread(target=start_gui, daemon=True)
+    gui_thread.start()
+
+# ===================== Run until the shell (headless: every job) exits =====================
+if sys.platform == "win32":
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())   # add_reader on the relay socket
+try:
+    asyncio.run(sessions.run())
+finally:
+    sessions.close()
+    engine.close()
+    if rec: rec.close()
+    if jobs_db: jobs_db.close()
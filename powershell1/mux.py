@@ -0,0 +1,83 @@
+# mux.py — several child terminals under one wrapper process
+# - One asyncio loop, one audio engine, one tone cache for every session
+# - One console session (keyboard + stdout); the rest are background jobs whose output is
+#   only watched (ticks / stop beep), each at its own pitch and optionally its own quiet window
+# - Per session: a Session object, a pty and its descriptors; no threads on POSIX
+import asyncio, os, threading
+import session, shellmarks, terminal, tones
+from sounds import Sounds, pitch_for
+
+class Multiplexer:
+    """Hosts N sessions on one event loop; they share `engine`, `cache` and `history`."""
+
+    def __init__(self, settings, engine, cache=None, history=None):
+        self.settings = settings
+        self.engine = engine
+        self.cache = cache or tones.tone_cache
+        self.history = history     # history.History: every session's jobs
+        self.sessions = []
+        self._devnull = None
+
+    def add(self, argv=None, name=None, quiet_sec=None, console=False, out=None, recorder=None, marks=False):
+        """Spawn argv as a new session; background (console=False) output goes to `out` or nowhere.
+
+        marks: set an interactive bash / PowerShell up to print OSC 133 marks (shellmarks.py).
+        """
+        if not console and out is None:
+            if self._devnull is None: self._devnull = open(os.devnull, "wb")
+            out = self._devnull
+        idx = len(self.sessions)
+        argv = list(argv or terminal.DEFAULT_COMMAND)
+        term = terminal.open_terminal(shellmarks.integrate(argv) if marks else argv, console=console)
+        sounds = Sounds(self.settings, self.engine, self.cache, pitch=pitch_for(idx))
+        name = name or " ".join(argv)
+        sess = session.Session(term, self.settings, sounds, out=out, name=name, recorder=recorder,
+                               quiet_sec=quiet_sec, console=console, history=self.history)
+        self.sessions.append(sess)
+        return sess
+
+    @property
+    def console(self):
+        """The session that owns the keyboard and stdout, if any."""
+        return next((s for s in self.sessions if s.console), None)
+
+    async def run(self):
+        """Run every session; return when the console session exits (or, headless, all of them)."""
+        tasks = [asyncio.ensure_future(s.run()) for s in self.sessions]
+        main = self.console
+        if main is not None:
+            await tasks[self.sessions.index(main)]
+        else:
+            await asyncio.gather(*tasks)
+        for t in tasks: t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def warm_up(self, reason="startup", stale=(), changes=None):
+        """Every session's pitch, rendered one after another on a single background thread.
+
+        changes (GUI Apply): Settings fields rendered first and assigned under the lock only
+        then, so playback always finds the old or the new sounds cached; `stale` is then a
+        function of the replaced values, giving the (freq, ms) tones to drop.
+        """
+        settings = self.settings
+        def run():
+            for s in self.sessions: s.sounds.warm_up(reason, background=False, changes=changes)
+            old = stale
+            if changes:
+                with settings.lock:
+                    old = {k: getattr(settings, k) for k in changes}
+                    for k, v in changes.items(): setattr(settings, k, v)
+                old = stale(old)
+            for s in self.sessions: s.sounds.discard(old)
+        threading.Thread(target=run, name="warm-up", daemon=True).start()
+
+    def interrupt(self):
+        """Ctrl+C goes to the console session only."""
+        if self.console: self.console.interrupt()
+
+    def close(self):
+        for s in self.sessions: s.term.close()
+        if self._devnull is not None: self._devnull.close()
+
+    def stats(self) -> list:
+        return [s.status() for s in self.sessions]
@@ -0,0 +1,48 @@
+# prompts.py — recognise a shell prompt or an input request at the end of child output
+# - A bounded tail of recent output (escape sequences removed) is matched against
+#   precompiled patterns anchored at its end: constant work per chunk, whatever its size
+# - PROMPT: the shell is back (PowerShell, cmd, bash/zsh, Python REPL): done, no need
+#   to wait out the quiet window
+# - INPUT: the child is waiting on the user ([Y/n], passwords, PowerShell confirmations)
+import re
+import vt
+
+PROMPT = "prompt"
+INPUT  = "input"
+
+_PROMPT = re.compile(rb"""(?mx)^(?:
+      PS\ [^\r\n]*>\ ?                          # PowerShell: PS C:\\src>
+    | [A-Za-z]:\\[^\r\n>]*>                     # cmd.exe: C:\\src>
+    | (?:\([^\r\n)]*\)\ )?[\w.-]+@[\w.-]+:[^\r\n]*[$#%]\ ?  # bash / zsh: user@host:~/src$ (not npm's pkg@1.2 ... 100%)
+    | [^\r\n\w$#%]{0,3}[$#%]\ ?                 # bare $ / # / % (not "##")
+    | >>>\ ?                                    # Python REPL
+)\Z""")
+_INPUT = re.compile(rb"""(?ix)(?:
+      [\[(]\s*y(?:es)?\s*/\s*n(?:o)?\s*[\])]          # [Y/n] (y/N) (yes/no)
+    | \(yes/no(?:/\[fingerprint\])?\)\??                # ssh host key
+    | \b(?:password|passphrase|passcode|pin)\b[^\r\n:]*:   # sudo / ssh / gpg (not "Skipping:")
+    | \(default\ is\ "[^"]*"\):                        # PowerShell confirmation / Read-Host choice
+    | \bpress\ (?:any\ key|enter|return)\b[^\r\n]*     # not "Compress return values"
+    | \b(?:continue|proceed|overwrite|are\ you\ sure)\b[^\r\n]*\?   # not "test_continue_flag ... ok?"
+)[ \t]*\Z""")
+
+class PromptDetector:
+    """Feed raw output chunks; feed() returns PROMPT, INPUT or None for the text now at the end."""
+    TAIL = 512   # bytes of recent output kept (longer than any prompt line)
+
+    def __init__(self):
+        self._tail = b""
+        self.hits = dict.fromkeys((PROMPT, INPUT), 0)
+
+    def feed(self, data: bytes):
+        tail = (self._tail + data[-self.TAIL:])[-self.TAIL:]
+        self._tail = tail
+        line = vt.strip(tail)
+        line = line[line.rfind(b"\n") + 1:]
+        line = line[line.rfind(b"\r") + 1:] or line   # what is visible after a \r redraw
+        if not line.strip(): return None
+        if _INPUT.search(line): kind = INPUT
+        elif _PROMPT.search(line): kind = PROMPT
+        else: return None
+        self.hits[kind] += 1
+        return kind
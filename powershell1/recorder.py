@@ -0,0 +1,104 @@
+# recorder.py — session recording in asciicast v2 (asciinema-compatible)
+# - Child output ("o"), forwarded keystrokes ("i") and wrapper state ("m" markers:
+#   writing / stop) with monotonic timestamps
+# - The session only appends to a list; a writer thread (batchwriter.BatchWriter) encodes
+#   and writes in batches
+# - Append-only; rotates to PATH.1, PATH.2, ... once a file passes max_bytes
+import codecs, json, os, time
+from batchwriter import BatchWriter
+
+class Recorder(BatchWriter):
+    """Buffered asciicast v2 writer. output()/input()/marker() are cheap and never block on disk."""
+    FLUSH_SEC = 0.25     # batch window after the first event of a burst
+    KEEP = 5             # rotated files kept (PATH.1 .. PATH.KEEP)
+
+    def __init__(self, path, width=80, height=24, command="", max_bytes=64 * 1024 * 1024, env=None):
+        self.path = path
+        self.width, self.height = width, height
+        self.command = command
+        self.env = env if env is not None else {k: os.environ[k] for k in ("SHELL", "TERM") if k in os.environ}
+        self.max_bytes = max_bytes
+        self._f = None
+        self._t0 = self._start = time.monotonic()
+        self._size = 0
+        self._out_dec = codecs.getincrementaldecoder("utf-8")("replace")
+        self.events = self.bytes_written = self.files = 0
+        super().__init__("recorder")
+
+    # ===================== Hot path =====================
+    def _add(self, code, data):
+        self._put((time.monotonic(), code, data))   # (monotonic, code, bytes | str)
+
+    def output(self, data: bytes):
+        """Raw child output, decoded by the writer thread."""
+        self._add("o", data)
+
+    def input(self, keys: str):
+        self._add("i", keys)
+
+    def marker(self, label: str):
+        """A wrapper state transition, e.g. "writing" or "stop"."""
+        self._add("m", label)
+
+    def resize(self, cols: int, rows: int):
+        self._add("r", f"{cols}x{rows}")
+
+    # ===================== Writer thread =====================
+    def _open(self, t0):
+        if self._f is None and os.path.exists(self.path) and os.path.getsize(self.path):
+            self._shift()   # never append a second header to an earlier recording
+        self._f = open(self.path, "w", encoding="ascii", newline="\n")
+        self._t0 = t0
+        self._size = 0
+        header = {"version": 2, "width": self.width, "height": self.height,
+                  "timestamp": int(time.time() - (time.monotonic() - t0))}
+        if self.command: header["command"] = self.command
+        if self.env: header["env"] = self.env
+        self._write(json.dumps(header) + "\n")
+        self.files += 1
+
+    def _shift(self):
+        for i in range(self.KEEP - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def _write(self, text):
+        self._f.write(text)
+        self._size += len(text)
+        self.bytes_written += len(text)
+
+    def _drain(self, batch):
+        lines, size = [], 0
+        for t, code, data in batch:
+            if self._f is None: self._open(self._start)
+            if code == "o":
+                data = self._out_dec.decode(data)
+                if not data: continue     # half a UTF-8 sequence: goes out with the next chunk
+            line = f"[{t - self._t0:.6f}, \"{code}\", {json.dumps(data)}]\n"   # ASCII: len == bytes
+            lines.append(line)
+            size += len(line)
+            if self._size + size >= self.max_bytes:
+                self._write("".join(lines))
+                lines, size = [], 0
+                self._f.close()
+                self._shift()
+                self._open(t)
+        if lines: self._write("".join(lines))
+        self._f.flush()
+        self.events += len(batch)
+
+    def _write_batch(self, batch):
+        try:
+            self._drain(batch)
+        except OSError:
+            pass   # disk full / unplugged: recording is best-effort
+
+    def close(self, timeout=2.0):
+        """Write what is buffered and close the file."""
+        super().close(timeout)
+        if self._f is not None: self._f.close()
+
+    def stats(self) -> dict:
+        return {"path": self.path, "events": self.events, "pending": self.pending,
+                "bytes": self.bytes_written, "files": self.files}
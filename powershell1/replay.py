@@ -0,0 +1,222 @@
+# replay.py — recorded sessions through the activity detector on a virtual clock
+# - Reads asciicast v2 recordings (index.py --record); output is classified (vt.py) as live,
+#   then only the timestamps of output that counts as activity matter
+# - Same ActivityMachine as the live session, so the beeps are the ones it would have played
+# - No sleeping: a long session replays in milliseconds, so parameter grids are cheap
+#   python replay.py REC.cast [--quiet 3] [--gap 120] [--ms 30] [--no-stream]   -> fired ticks / stops
+#   python replay.py *.cast --sweep quiet=1,2,3 gap=80,120 burst=0,0.5 hyst=0.2  -> grid summary
+import argparse, heapq, itertools, json, sys, time
+import prompts, shellmarks, vt
+from activity import ACTIVE, DONE, ActivityMachine, AdaptiveQuiet
+
+def load_cast(path, classes=(vt.CONTENT,), detect_prompts=True, shell_marks=True):
+    """asciicast v2 file -> (times of output that counts as activity, prompt / command hits
+    [(t, kind)], recorded markers [(t, label)]).
+
+    Output is classified by vt.VtClassifier, prompts.PromptDetector and shellmarks.MarkParser
+    like the live session does; classes=None keeps all output. Once the shell prints OSC 133
+    marks, only output inside a command counts, and its start / end are hits: "command",
+    then "ok" or "fail".
+    """
+    out, hits, marks = [], [], []
+    cls, det, mp = vt.VtClassifier(), prompts.PromptDetector(), shellmarks.MarkParser()
+    command = False
+    with open(path, encoding="utf-8") as f:
+        json.loads(f.readline())   # header
+        for line in f:
+            if not line.strip(): continue
+            t, code, data = json.loads(line)
+            if code == "o":
+                data = data.encode("utf-8", "surrogateescape")
+                counts = cls.feed(data) in classes if classes is not None else True
+                hit = det.feed(data) if detect_prompts else None
+                if shell_marks:
+                    started = finished = False
+                    for kind, code in mp.feed(data):
+                        if kind == shellmarks.COMMAND:
+                            command = started = True
+                            hits.append((t, "command"))
+                        elif kind == shellmarks.FINISHED and command:
+                            command, finished = False, True
+                            hits.append((t, "ok" if not code else "fail"))
+                    if finished and not command: continue   # unless a C after the D (type-ahead) started the next one
+                    if mp.seen:
+                        counts = started or (counts and command)
+                        if hit == prompts.PROMPT: hit = None
+                if counts: out.append(t)
+                if hit: hits.append((t, hit))
+            elif code == "m": marks.append((t, data))
+    return out, hits, marks
+
+def tick_period(run_ms, run_gap, stream=True) -> float:
+    """Seconds between tick onsets, as the session schedules them."""
+    return (max(run_ms, run_gap) if stream else run_gap) / 1000.0   # stream period: tick + silence
+
+def replay(out_times, quiet_sec=3.0, period=0.12, ticks=True, hits=(), min_burst=0.0, hysteresis=None,
+           debounce=0.0, adapt=None, marks_min=1.0):
+    """Fired events [(t, "writing" | "tick" | "stop" | "input" | "fail")] for output at
+    `out_times` and prompt / input-request / command hits [(t, kind)] (both sorted).
+
+    adapt: an activity.AdaptiveQuiet (fresh per run) to learn the quiet window, as the
+    session does with settings.adaptive. marks_min: Settings.marks_min_sec.
+    """
+    det = ActivityMachine(quiet_sec, min_burst, hysteresis, debounce)
+    fired = []
+    next_tick = started_at = command_at = None
+
+    def advance(until):
+        nonlocal next_tick
+        while det.deadline is not None:
+            deadline = det.deadline
+            if next_tick is not None and next_tick < deadline:
+                if next_tick > until: return
+                fired.append((next_tick, "tick"))
+                next_tick += period
+            else:
+                if deadline > until: return
+                if det.expire(deadline) == DONE and command_at is None: fired.append((deadline, "stop"))
+                next_tick = None   # a marked command gone quiet: its end chimes, not the silence
+
+    for t, order, hit in heapq.merge(((t, 0, None) for t in out_times), ((t, 1, k) for t, k in hits)):
+        if hit is None:
+            advance(t)
+            if adapt:
+                adapt.output(t)
+                det.quiet_sec = adapt.threshold(quiet_sec)
+            if det.output(t) == ACTIVE:
+                fired.append((t, "writing"))
+                started_at = t
+                if ticks: next_tick = t
+            continue
+        if hit == "command":
+            command_at = t
+            continue
+        if adapt: adapt.pause()
+        if hit in ("ok", "fail"):
+            if command_at is None: continue
+            advance(t)
+            next_tick = None
+            det.finish(t)
+            if t - command_at >= marks_min: fired.append((t, "stop" if hit == "ok" else "fail"))
+            command_at = None
+            continue
+        if det.deadline is None: continue
+        if hit == prompts.PROMPT and started_at == t:   # output and prompt together: silent
+            det.finish(t)
+            next_tick = None
+            continue
+        advance(t)
+        next_tick = None
+        if det.finish(t) == DONE:   # else a burst still waiting: dropped silently
+            fired.append((t, "input" if hit == prompts.INPUT else "stop"))
+    advance(float("inf"))
+    return fired
+
+def summarize(fired, out_times, early_sec):
+    """Counts for one replay: ticks, stops (incl. input requests), stops the child proved
+    early (output within early_sec), and the summed latency of the stops (sec after the
+    last output)."""
+    ticks = stops = early = 0
+    latency = 0.0
+    i, n = 0, len(out_times)
+    for t, kind in fired:
+        if kind == "tick": ticks += 1
+        elif kind in ("stop", "input", "fail"):
+            stops += 1
+            while i < n and out_times[i] <= t: i += 1
+            if i: latency += t - out_times[i - 1]
+            if i < n and out_times[i] - t <= early_sec: early += 1
+    return ticks, stops, early, latency
+
+AXES = ("quiet", "gap", "ms", "burst", "hyst", "debounce", "mult")
+
+def _grid(specs):
+    """["quiet=1,2", "gap=80,120"] -> list of {name: value} combinations."""
+    axes = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in AXES:
+            raise SystemExit(f"unknown sweep axis {name!r} ({', '.join(AXES)})")
+        axes[name] = [float(v) for v in values.split(",")]
+    return [dict(zip(axes, combo)) for combo in itertools.product(*axes.values())]
+
+def _adapt(a, multiple):
+    """A fresh AdaptiveQuiet for one replay if --adaptive, else None."""
+    if not a.adaptive: return None
+    return AdaptiveQuiet(a.quiet_quantile, multiple, a.quiet_min, a.quiet_max)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay recorded sessions through the activity detector.")
+    ap.add_argument("casts", nargs="+", help="asciicast v2 recordings")
+    ap.add_argument("--quiet", type=float, default=3.0, help="silence before stop beep (sec)")
+    ap.add_argument("--gap", type=float, default=120, help="ms gap between ticks")
+    ap.add_argument("--ms", type=float, default=30, help="ms each running tick")
+    ap.add_argument("--min-burst", type=float, default=0.0, help="sec of output before ticks start")
+    ap.add_argument("--hysteresis", type=float, help="sec gap that breaks a burst short of --min-burst")
+    ap.add_argument("--debounce", type=float, default=0.0, help="sec after a stop during which output is ignored")
+    ap.add_argument("--adaptive", action="store_true",
+                    help="learn the quiet window from the output gaps (--quiet until enough are seen)")
+    ap.add_argument("--quiet-min", type=float, default=1.0, help="bounds of the learned window (sec)")
+    ap.add_argument("--quiet-max", type=float, default=15.0)
+    ap.add_argument("--quiet-quantile", type=float, default=0.99, help="gap quantile the window is learned from")
+    ap.add_argument("--quiet-multiple", type=float, default=1.5, help="learned window: this x the gap quantile")
+    ap.add_argument("--no-stream", action="store_true", help="timer ticks instead of a tick stream")
+    ap.add_argument("--count", default=vt.CONTENT, metavar="CLASSES",
+                    help="output classes that count as activity: " + ",".join(vt.CLASSES) + " or all")
+    ap.add_argument("--no-prompts", action="store_true", help="ignore prompt / input-request detection")
+    ap.add_argument("--no-marks", action="store_true", help="ignore OSC 133 shell-integration marks")
+    ap.add_argument("--marks-min", type=float, default=1.0, help="marked commands shorter than this are silent")
+    ap.add_argument("--sweep", nargs="+", metavar="AXIS=V1,V2", help="grid over " + " / ".join(AXES))
+    ap.add_argument("--early", type=float, default=10.0,
+                    help="a stop followed by output within this many sec counts as early")
+    a = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    classes = None if a.count == "all" else tuple(a.count.split(","))
+    sessions = [(path,) + load_cast(path, classes, not a.no_prompts, not a.no_marks) for path in a.casts]
+    t_load = time.perf_counter() - t0
+    span = sum(out[-1] for _, out, _, _ in sessions if out)
+
+    if not a.sweep:
+        period = tick_period(a.ms, a.gap, not a.no_stream)
+        for path, out, hits, marks in sessions:
+            adapt = _adapt(a, a.quiet_multiple)
+            fired = replay(out, a.quiet, period, hits=hits, min_burst=a.min_burst, hysteresis=a.hysteresis,
+                           debounce=a.debounce, adapt=adapt, marks_min=a.marks_min)
+            print(f"# {path}")
+            for t, kind in fired:
+                if kind != "tick" or len(a.casts) == 1: print(f"{t:12.6f}  {kind}")
+            ticks, stops, early, latency = summarize(fired, out, a.early)
+            rec = sum(1 for _, label in marks if label in ("stop", "input", "fail"))
+            print(f"# {ticks} ticks, {stops} stops ({early} early, {latency / max(stops, 1):.2f} s after output), "
+                  f"recorded: {rec} stops")
+            if adapt:
+                st = adapt.stats()
+                learned = f"{st['threshold_sec']:.2f} s" if st["learned"] else f"not yet, {a.quiet:g} s used"
+                print(f"# learned quiet window: {learned} ({st['gaps']} gaps, "
+                      f"p{a.quiet_quantile * 100:g} {st['gap_sec'] or 0:.2f} s)")
+        return
+
+    grid = _grid(a.sweep)
+    print(f"{'quiet':>6} {'gap':>6} {'ms':>5} {'burst':>6} {'hyst':>5} {'deb':>5} {'mult':>5} "
+          f"{'ticks':>9} {'stops':>7} {'early':>7} {'latency':>8}")
+    t1 = time.perf_counter()
+    for p in grid:
+        q, gap, ms = p.get("quiet", a.quiet), p.get("gap", a.gap), p.get("ms", a.ms)
+        burst, hyst, deb = p.get("burst", a.min_burst), p.get("hyst", a.hysteresis), p.get("debounce", a.debounce)
+        mult = p.get("mult", a.quiet_multiple)
+        period = tick_period(ms, gap, not a.no_stream)
+        totals = [0, 0, 0, 0.0]
+        for _, out, hits, _ in sessions:
+            fired = replay(out, q, period, hits=hits, min_burst=burst, hysteresis=hyst, debounce=deb,
+                           adapt=_adapt(a, mult), marks_min=a.marks_min)
+            for k, v in enumerate(summarize(fired, out, a.early)): totals[k] += v
+        print(f"{q:>6g} {gap:>6g} {ms:>5g} {burst:>6g} {hyst if hyst is not None else q:>5g} {deb:>5g} "
+              f"{mult if a.adaptive else '-':>5} {totals[0]:>9} {totals[1]:>7} {totals[2]:>7} "
+              f"{totals[3] / max(totals[1], 1):>7.2f}s")
+    t_run = time.perf_counter() - t1
+    print(f"# {len(sessions)} sessions ({span:.0f} s recorded) x {len(grid)} settings: "
+          f"load {t_load:.2f} s, replay {t_run:.2f} s ({span * len(grid) / max(t_run, 1e-9):,.0f}x real time)")
+
+if __name__ == "__main__":
+    sys.exit(main())
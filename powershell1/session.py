@@ -0,0 +1,413 @@
+# session.py — one wrapped shell as an object driven by an asyncio event loop
+# - Settings: the tunables the GUI edits (tick, stop chime, volumes, quiet window)
+# - Session: child output, keystrokes, the quiet deadline and tick scheduling are
+#   readers and timers on one loop; nothing runs while nothing happens
+# Several sessions can share one loop, one audio engine and one tone cache.
+# An optional recorder.Recorder gets output, keystrokes and state changes (writing / stop / fail),
+# an optional history.History one row per job (writing spell or marked command).
+# A shell that prints OSC 133 marks (shellmarks.py) gives exact command boundaries; the
+# quiet window and prompt matching are then only the fallback for unmarked children.
+import asyncio, re, threading, time
+from dataclasses import dataclass, field
+from activity import ACTIVE, DONE, ActivityMachine, AdaptiveQuiet, RateMeter
+import prompts, shellmarks, terminal, vt
+
+@dataclass
+class Settings:
+    quiet_sec: float = 3.0          # silence window before stop beep
+    adaptive: bool = False          # learn the window from the run's output gaps instead (activity.AdaptiveQuiet)
+    quiet_min: float = 1.0          # bounds of the learned window (sec)
+    quiet_max: float = 15.0
+    quiet_quantile: float = 0.99    # learned window: quiet_multiple x this quantile of the gaps
+    quiet_multiple: float = 1.5
+    min_burst: float = 0.0          # sec of output before ticks start (0: at once)
+    hysteresis: float = None        # sec gap that breaks a burst still short of min_burst (None: quiet_sec)
+    debounce: float = 0.0           # sec after a stop during which output is ignored
+    run_freq: int = 600             # Hz while bytes are flowing
+    run_ms: int = 30                # ms each running tick
+    run_gap: int = 120              # ms gap between ticks
+    stop_1: tuple = (440, 160)      # (Hz, ms) first stop tone
+    stop_2: tuple = (330, 160)      # second stop tone (None to disable)
+    input_1: tuple = (660, 80)      # (Hz, ms) "input needed" tones: rising, unlike the stop chime
+    input_2: tuple = (880, 120)
+    prompt_detect: bool = True      # stop at once on a prompt / input request (prompts.py)
+    shell_marks: bool = True        # follow OSC 133 command marks when the shell prints them
+    marks_min_sec: float = 1.0      # marked commands shorter than this finish silently
+    fail_1: tuple = (294, 140)      # (Hz, ms) "command failed" tones: low, unlike the stop chime
+    fail_2: tuple = (196, 320)
+    tick_stream: bool = True        # loop one tick+silence period into an open stream while writing
+    mute: bool = False
+    master_volume: int = 60         # 0..100
+    run_volume: int = 50            # 0..100  (ticks)
+    stop_volume: int = 70           # 0..100  (stop tones)
+    activity: tuple = (vt.CONTENT,) # output classes that count as writing (vt.CLASSES)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def effective_volume(self, per_sound_pct: int) -> int:
+        """Combine master + per-sound volume, clamp 0..100."""
+        with self.lock:
+            if self.mute: return 0
+            m = self.master_volume
+        return int(max(0, min(100, (m * per_sound_pct) / 100)))
+
+    @staticmethod
+    def _chime(*beeps):
+        events, at = [], 0
+        for sb in beeps:
+            if sb:
+                events.append((int(sb[0]), int(sb[1]), at, 1.0))
+                at += int(sb[1])
+        return events, at
+
+    def stop_events(self):
+        """Stop chime as mixer events: #2 starts as #1 ends. Returns (events, total_ms)."""
+        with self.lock:
+            return self._chime(self.stop_1, self.stop_2)
+
+    def input_events(self):
+        """"Input needed" chime as mixer events. Returns (events, total_ms)."""
+        with self.lock:
+            return self._chime(self.input_1, self.input_2)
+
+    def fail_events(self):
+        """"Command failed" chime as mixer events. Returns (events, total_ms)."""
+        with self.lock:
+            return self._chime(self.fail_1, self.fail_2)
+
+    def tick_params(self):
+        """(freq, ms, gap, stream, volume) of the running tick."""
+        with self.lock:
+            p = (self.run_freq, self.run_ms, self.run_gap, self.tick_stream)
+            vol = self.run_volume
+        return p + (self.effective_volume(vol),)
+
+class Session:
+    """A child terminal mirrored to `out`, ticking while it writes, chiming when it goes quiet."""
+
+    def __init__(self, term, settings, sounds, out=None, name="", recorder=None, quiet_sec=None,
+                 console=True, history=None):
+        self.term = term
+        self.settings = settings
+        self.sounds = sounds
+        self.name = name
+        self.recorder = recorder
+        self.history = history
+        self.quiet_sec = quiet_sec   # None: follow settings.quiet_sec
+        self.console = console       # False: a background job, never reads the keyboard
+        self.meter = RateMeter()     # fed loop time, like the detector
+        self.vt = vt.VtClassifier()  # spinners / redraws / control-only output aren't activity
+        self.prompts = prompts.PromptDetector()
+        self.marks = shellmarks.MarkParser()
+        self._command_at = None    # loop time a marked command started (OSC 133 C), None between them
+        self.out = terminal.Passthrough(out)
+        self.detector = ActivityMachine(settings.quiet_sec)   # fed loop time
+        self.adapt = AdaptiveQuiet()   # gaps are learned whether or not settings.adaptive is on
+        self.alive = False
+        self._loop = None
+        self._done = None
+        self._quiet = None         # TimerHandle: stop chime deadline (may be earlier than the real one)
+        self._quiet_at = None      # loop time it is set for
+        self.wakeups = 0           # quiet-timer callbacks run (none while idle)
+        self._tick_timer = None    # TimerHandle: next one-shot tick (stream off)
+        self._ticking = False      # a tick timer or tick stream is running
+        self._readers = []
+        self._keys_out = bytearray()   # keystrokes the child hasn't taken yet (sent when its fd is writable)
+        self._job = None           # (command, wall start, loop start, bytes, lines) of the running job
+        self._before = (0, 0)      # meter totals before the current chunk
+        self._typing = ""          # console: the line being typed
+        self._line = ""            # console: a line entered that no job has taken yet (its command)
+
+    @property
+    def writing(self) -> bool:
+        return self.detector.writing
+
+    @property
+    def last_out(self):
+        """Loop time of the last output (None before any)."""
+        return self.detector.last_out
+
+    async def run(self):
+        """Mirror the child until it exits."""
+        loop = self._loop = asyncio.get_running_loop()
+        self._done = loop.create_future()
+        self.alive = True
+        if not self._add_reader(self.term.fileno(), self._on_readable):
+            self._thread(self._read_output, "output")
+        if self.console and not self._add_reader(self.term.input_fileno(), self._on_keys):
+            self._thread(self._read_keys, "keys")
+        try:
+            await self._done
+        finally:
+            self.alive = False
+            for fd in self._readers: loop.remove_reader(fd)
+            self._readers.clear()
+            if self._keys_out:
+                self._keys_out.clear()
+                loop.remove_writer(self.term.write_fileno())
+            for h in (self._quiet, self._tick_timer):
+                if h: h.cancel()
+            self._end_job("exit")
+            self.out.flush()
+
+    def _add_reader(self, fd, callback) -> bool:
+        if fd is None: return False
+        try:
+            self._loop.add_reader(fd, callback)
+        except (OSError, ValueError, NotImplementedError):
+            return False   # e.g. epoll and a regular file on stdin, or a proactor loop
+        self._readers.append(fd)
+        return True
+
+    def _thread(self, target, what):
+        threading.Thread(target=target, name=f"{self.name or 'session'}-{what}", daemon=True).start()
+
+    def _finish(self):
+        if not self._done.done(): self._done.set_result(None)
+
+    def status(self) -> dict:
+        """Name, activity and output rate for the GUI / stats (callable from any thread)."""
+        return {"name": self.name, "alive": self.alive, "writing": self.writing,
+                "state": self.detector.state, "pitch": self.sounds.pitch,
+                "quiet_sec": self.detector.quiet_sec, "adaptive": self.adapt.stats(),
+                "marks": dict(self.marks.counts) if self.marks.seen else None,
+                "command": self._command_at is not None,
+                "prompts": dict(self.prompts.hits), "wakeups": self.wakeups,
+                "rate": self.meter.stats(time.monotonic())}   # loop time is time.monotonic()
+
+    def interrupt(self):
+        """Ctrl+C to the child."""
+        try:
+            self.term.write('\x03')
+        except Exception:
+            pass
+
+    # ===================== Child output =====================
+    def _on_readable(self):
+        data = self.term.read_available()
+        if data is None: return
+        if not data:
+            self._finish()
+            return
+        self._on_output(data, self.term.wait_readable(0))
+
+    def _read_output(self):
+        """Blocking reads for terminals without a selectable descriptor."""
+        while True:
+            data = self.term.read()
+            if not data:
+                self._loop.call_soon_threadsafe(self._finish)
+                return
+            self._loop.call_soon_threadsafe(self._on_output, data, False)
+
+    def _on_output(self, data: bytes, more: bool):
+        self.out.write(data)
+        if self.recorder: self.recorder.output(data)
+        if not more: self.out.flush()   # child went quiet: show everything now
+        now = self._loop.time()
+        if self.history: self._before = (self.meter.total_bytes, self.meter.total_lines)   # a job counts its first chunk
+        self.meter.update(now, len(data), data.count(b"\n"))
+        kind = self.vt.feed(data)
+        s = self.settings
+        det, adapt = self.detector, self.adapt
+        with s.lock:
+            counts, q, detect, adaptive = kind in s.activity, s.quiet_sec, s.prompt_detect, s.adaptive
+            use_marks, marks_min = s.shell_marks, s.marks_min_sec
+            if counts:
+                det.min_burst, det.hysteresis, det.debounce = s.min_burst, s.hysteresis, s.debounce
+                adapt.min_sec, adapt.max_sec = s.quiet_min, s.quiet_max
+                adapt.quantile, adapt.multiple = s.quiet_quantile, s.quiet_multiple
+        hit = self.prompts.feed(data) if detect else None   # looks at a bounded tail only
+        if use_marks and self._on_marks(self.marks.feed(data), now, marks_min) and self._command_at != now:
+            return   # a command finished and no other started: the rest is the shell's
+        if use_marks and self.marks.seen:   # integrated shell: its marks say when a command runs
+            counts = self._command_at == now or (counts and self._command_at is not None)   # C: ticks at once
+            if hit == prompts.PROMPT: hit = None
+        started = False
+        if counts:
+            adapt.output(now)
+            if adaptive: q = adapt.threshold(q)
+            det.quiet_sec = q if self.quiet_sec is None else self.quiet_sec
+            started = det.output(now) == ACTIVE
+        if hit: adapt.pause()   # the next gap is the user's, not the job's
+        if hit and det.deadline is not None:   # writing, or a burst still waiting
+            if det.finish(now) != DONE or (started and hit == prompts.PROMPT):
+                self._end_job(hit)   # e.g. cd foo: nothing to announce, but its job is over
+                return   # still waiting, or output and prompt together
+            self._stop(hit)
+            return
+        if hit == prompts.PROMPT: self._end_job(hit)   # a command that printed nothing of its own
+        if not counts: return   # e.g. a spinner: neither starts ticks nor postpones the stop beep
+        # Lazy re-arm: output only moves the detector's deadline; the armed timer finds the
+        # new one when it fires. Re-arm now only if the deadline got earlier (quiet_sec cut).
+        deadline = det.deadline   # None: ignored (debounce)
+        if deadline is not None and (self._quiet is None or deadline < self._quiet_at):
+            self._arm_quiet(deadline)
+        if started: self._started()
+
+    def _on_marks(self, marks, now, min_sec) -> bool:
+        """OSC 133 marks in a chunk, in order: C starts a command, D ends it with a success or
+        failure chime right away (a C after it, e.g. type-ahead, starts the next one). True if
+        a command finished."""
+        finished = False
+        for kind, code in marks:
+            if kind == shellmarks.COMMAND:
+                self._command_at = now
+                if self.history: self._begin_job()   # the job is the command: a spell before it (echo) isn't one
+            elif kind == shellmarks.FINISHED and self._command_at is not None:
+                ran, self._command_at = now - self._command_at, None
+                self.detector.finish(now)
+                self.adapt.pause()
+                if ran >= min_sec:
+                    self._stop("ok" if not code else "fail", code)
+                else:
+                    self._halt()   # too short to announce
+                    self._end_job("ok" if not code else "fail", code)
+                finished = True
+        return finished
+
+    def _started(self):
+        if self.recorder: self.recorder.marker("writing")
+        if self.history and self._job is None and not self._typing: self._begin_job()   # not the echo of typing
+        if not self._ticking: self._tick()
+
+    def _begin_job(self):
+        """A job starts now. Its command is the line entered for it; a job restarted before
+        taking one (OSC 133 C after Enter) keeps its command."""
+        command = self._line or (self._job[0] if self._job else self.name)
+        self._line = ""
+        self._job = (command, time.time(), self._loop.time()) + self._before
+        self.meter.peak_bps = 0.0
+
+    def _end_job(self, ended, code=None):
+        """The running job (if any) ended: one history row."""
+        if self._job is None: return
+        command, wall, start, nbytes, nlines = self._job
+        self._job = None
+        m = self.meter
+        self.history.add(self.name, command, wall, start, self._loop.time(), m.total_bytes - nbytes,
+                         m.total_lines - nlines, m.peak_bps, code, ended)
+
+    def _arm_quiet(self, when):
+        if self._quiet: self._quiet.cancel()
+        self._quiet, self._quiet_at = self._loop.call_at(when, self._on_quiet, when), when
+
+    def _on_quiet(self, when):
+        """QUIET_SEC without output (loop clock: monotonic): stop ticking, play the stop chime."""
+        self._quiet = None
+        self.wakeups += 1
+        # The loop may run a timer up to one clock tick early; `when` is the deadline it was set for.
+        ended = self.detector.expire(max(self._loop.time(), when))
+        if ended == DONE:
+            if self._command_at is None: self._stop("quiet")
+            else: self._halt()   # a marked command gone quiet: ticks end, its D mark chimes
+        elif ended is None and self.detector.deadline is not None:
+            self._arm_quiet(self.detector.deadline)   # output came since: sleep until the new deadline
+
+    def _halt(self):
+        """Stop ticking and the quiet timer, silently."""
+        if self._quiet:
+            self._quiet.cancel()
+            self._quiet = None
+        if self._tick_timer:
+            self._tick_timer.cancel()
+            self._tick_timer = None
+            self._ticking = False
+
+    def _stop(self, reason, code=None):
+        """Writing is over (quiet window, prompt, input request, marked command end): stop
+        ticking, chime."""
+        self._halt()
+        self._end_job(reason, code)
+        if reason == prompts.INPUT:
+            if self.recorder: self.recorder.marker("input")
+            self.sounds.play_input()
+        elif reason == "fail":
+            if self.recorder: self.recorder.marker("fail")
+            self.sounds.play_fail()
+        else:
+            if self.recorder: self.recorder.marker("stop")
+            self.sounds.play_stop()
+
+    # ===================== Keystrokes =====================
+    def _on_keys(self):
+        keys = self.term.read_keys(0)
+        if keys is None:   # console input closed: stop forwarding
+            self._loop.remove_reader(self._readers.pop())
+            return
+        if keys: self._forward_keys(keys)
+
+    _KEY_ESC = re.compile(r"\x1b(?:\[[0-?]*[ -/]*[@-~]|O.|.)?")   # arrows, function keys
+
+    def _forward_keys(self, keys: str):
+        if self.recorder: self.recorder.input(keys)
+        self._send_keys(keys.encode("utf-8"))
+        if self.history: self._track_line(keys)
+
+    def _send_keys(self, data: bytes):
+        """Keys to the child without blocking the loop: what the pty won't take now waits for
+        its fd to turn writable, so child output (the echo of a long paste) keeps being read."""
+        if self._keys_out:
+            self._keys_out += data   # behind keys still queued
+            return
+        try:
+            n = self.term.write_available(data)
+        except OSError:
+            return   # the child is gone
+        if n < len(data):
+            self._keys_out += data[n:]
+            self._loop.add_writer(self.term.write_fileno(), self._on_writable)
+
+    def _on_writable(self):
+        try:
+            n = self.term.write_available(self._keys_out)
+        except OSError:
+            n = len(self._keys_out)   # the child is gone: drop the rest
+        del self._keys_out[:n]
+        if not self._keys_out: self._loop.remove_writer(self.term.write_fileno())
+
+    def _track_line(self, keys: str):
+        """Follow simple line editing to know the command a job runs (history only)."""
+        line = self._typing
+        for ch in self._KEY_ESC.sub("", keys):
+            if ch in "\r\n":
+                if line.strip():
+                    self._line = line.strip()
+                    if self._job is None:   # type-ahead while a job runs: the next job takes it
+                        self._before = (self.meter.total_bytes, self.meter.total_lines)
+                        self._begin_job()
+                line = ""
+            elif ch in "\x7f\b": line = line[:-1]
+            elif ch in "\x03\x15": line = ""   # Ctrl+C, Ctrl+U
+            elif ch >= " ": line += ch
+        self._typing = line
+
+    def _read_keys(self):
+        """Blocking key reads where the console can't be waited on (Windows)."""
+        while self.alive:
+            keys = self.term.read_keys()   # Ctrl+C / Enter translated by the backend
+            if keys is None: return
+            if keys: self._loop.call_soon_threadsafe(self._forward_keys, keys)
+
+    # ===================== Ticks =====================
+    def _tick(self):
+        """Start (or keep) the running tick while 'writing': a stream, else one tick per gap."""
+        self._tick_timer = None
+        self._ticking = False
+        if not (self.writing and self.alive): return
+        f, ms, gap, stream, _vol = params = self.settings.tick_params()
+        if stream and self.sounds.stream_ticks(
+                params, lambda: self.writing and self.alive and self.settings.tick_params() == params,
+                on_done=self._stream_ended):
+            # Sample-accurate ticks from one open stream; restarts if a setting changes.
+            self._ticking = True
+            return
+        self.sounds.play_tick(f, ms)
+        self._ticking = True
+        self._tick_timer = self._loop.call_later(max(0.0, gap / 1000.0), self._tick)
+
+    def _stream_ended(self):
+        """Audio thread: the tick stream stopped; decide on the loop whether to start another."""
+        try:
+            self._loop.call_soon_threadsafe(self._tick)
+        except RuntimeError:
+            pass   # loop already closed
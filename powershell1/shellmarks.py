@@ -0,0 +1,98 @@
+# shellmarks.py — OSC 133 shell-integration marks: exact command boundaries and exit codes
+# - A shell set up for it prints ESC ] 133 ; A (prompt starts), B (prompt ends), C (the
+#   command runs) and D ; <exit code> (it finished) around every command line
+# - MarkParser finds them in child output (split across chunks or not); the session then
+#   starts ticks on C and chimes success / failure on D, with no quiet window to wait out
+# - integrate(argv): the same command with the marks set up, for bash and PowerShell
+import base64, os, re
+import tones
+
+PROMPT_START = "A"
+PROMPT_END   = "B"
+COMMAND      = "C"
+FINISHED     = "D"
+
+_MARK = re.compile(rb"\x1b\]133;([A-D])((?:;[^\x07\x1b]*)?)(?:\x07|\x1b\\)")
+_INTRO = b"\x1b]133;"
+MAX_CARRY = 256   # an unterminated mark longer than this is not one
+
+class MarkParser:
+    """Feed raw output chunks; feed() returns the marks in them as [(kind, exit code or None)]."""
+
+    def __init__(self):
+        self._carry = b""
+        self.seen = False          # any mark yet: the shell is integrated
+        self.counts = dict.fromkeys((PROMPT_START, PROMPT_END, COMMAND, FINISHED), 0)
+
+    def feed(self, data: bytes) -> list:
+        if self._carry:
+            data = self._carry + data
+            self._carry = b""
+        elif b"\x1b" not in data or (_INTRO not in data and b"\x1b" not in data[-len(_INTRO):]):
+            return []   # the common case: a memchr for ESC, then one substring scan
+        marks, end = [], 0
+        for m in _MARK.finditer(data):
+            kind, code = m.group(1).decode(), None
+            if kind == FINISHED:
+                arg = m.group(2)[1:].split(b";")[0]
+                code = int(arg) if arg.lstrip(b"-").isdigit() else None
+            marks.append((kind, code))
+            self.counts[kind] += 1
+            end = m.end()
+        i = data.rfind(b"\x1b", max(end, len(data) - MAX_CARRY))
+        if i >= 0 and b"\x07" not in data[i:] and b"\x1b\\" not in data[i:]:
+            tail = data[i:]
+            if tail.startswith(_INTRO) or _INTRO.startswith(tail):
+                self._carry = tail   # a mark cut off by the read: finish it with the next chunk
+        if marks: self.seen = True
+        return marks
+
+# ===================== Shell setup =====================
+_BASH = r"""# written by the Jobs wrapper (shellmarks.py): your ~/.bashrc plus OSC 133 marks
+[ -f ~/.bashrc ] && . ~/.bashrc
+__jobs_marks() { local s=$?; printf '\e]133;D;%s\a\e]133;A\a' "$s"; }
+PROMPT_COMMAND="__jobs_marks${PROMPT_COMMAND:+; $PROMPT_COMMAND}"
+PS1="$PS1\[\e]133;B\a\]"
+PS0=$'\e]133;C\a'
+"""
+
+_POWERSHELL = r"""
+$global:__jobsPrompt = $function:prompt
+function global:prompt {
+    $ok = $?
+    $code = if ($ok) { 0 } elseif ($global:LASTEXITCODE) { $global:LASTEXITCODE } else { 1 }
+    $e, $b = [char]27, [char]7
+    "$e]133;D;$code$b$e]133;A$b" + (& $global:__jobsPrompt) + "$e]133;B$b"
+}
+if (Get-Module PSReadLine) {
+    Set-PSReadLineKeyHandler -Key Enter -ScriptBlock {
+        [Microsoft.PowerShell.PSConsoleReadLine]::AcceptLine()
+        [Console]::Write("$([char]27)]133;C$([char]7)")
+    }
+}
+"""
+
+def _shell(argv) -> str:
+    name = os.path.basename(argv[0]).lower()
+    return name[:-4] if name.endswith(".exe") else name
+
+def supported(argv) -> bool:
+    """True if integrate() knows how to set up marks for this command (an interactive shell)."""
+    shell = _shell(argv)
+    if shell == "bash": return argv[1:] in ([], ["-i"])   # a login shell ignores --rcfile
+    return shell in ("powershell", "pwsh") and not any(
+        a.lower() in ("-command", "-c", "-file", "-f", "-encodedcommand") for a in argv[1:])
+
+def integrate(argv):
+    """argv with OSC 133 marks set up if it starts an interactive bash or PowerShell; else as is."""
+    if not supported(argv): return argv
+    if _shell(argv) == "bash":
+        path = os.path.join(os.path.dirname(tones.default_cache_dir()), "shell-marks.bash")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f: f.write(_BASH)
+        except OSError:
+            return argv
+        return argv[:1] + ["--rcfile", path] + argv[1:]
+    encoded = base64.b64encode(_POWERSHELL.encode("utf-16-le")).decode("ascii")
+    return argv + ["-NoExit", "-EncodedCommand", encoded]
@@ -0,0 +1,133 @@
+# sounds.py — the wrapper's sounds: running tick, tick stream, stop / input / fail chimes, warm-up
+# - Everything is rendered through tones.tone_cache (full-scale once, volume as a gain stage)
+# - Everything plays on one audio.AudioEngine
+# - Startup / Apply warm-up times go to a timing log (stdout belongs to the shell)
+# - Per-session pitch: sessions sharing one engine stay tellable apart by ear
+import os, threading, time
+from dataclasses import replace
+import tones
+
+T0 = time.perf_counter()   # first import ~ process start, for the timing log
+TIMING_LOG = os.path.join(os.path.dirname(tones.default_cache_dir()), "timing.log")
+
+# Pitch ratios for session #0, #1, ...: consonant steps, then the same an octave up
+PITCHES = (1.0, 1.25, 1.5, 1.125, 1.6667, 2.0, 2.5, 3.0, 2.25, 3.3333, 0.75, 0.8333, 0.5625, 0.6667, 0.9375)
+
+def pitch_for(index: int) -> float:
+    return PITCHES[index % len(PITCHES)]
+
+def timing_log(msg: str):
+    """Append one line to the timing log."""
+    try:
+        os.makedirs(os.path.dirname(TIMING_LOG), exist_ok=True)
+        with open(TIMING_LOG, "a", encoding="utf-8") as f:
+            f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} +{(time.perf_counter() - T0) * 1000:9.1f} ms  {msg}\n")
+    except OSError:
+        pass
+
+class Sounds:
+    """Plays the tick / stop sounds described by a session.Settings on an audio engine.
+
+    `pitch` scales every frequency (rounded to whole Hz, which keeps renders periodic).
+    """
+
+    def __init__(self, settings, engine, cache=None, pitch=1.0):
+        self.settings = settings
+        self.engine = engine
+        self.cache = cache or tones.tone_cache
+        self.pitch = pitch
+
+    def _hz(self, freq) -> int:
+        return int(round(freq * self.pitch))
+
+    def _pitched(self, chime):
+        events, total_ms = chime
+        return [(self._hz(f), ms, at, gain) for f, ms, at, gain in events], total_ms
+
+    def play_tick(self, freq, dur_ms):
+        """Running tick (uses the tick volume)."""
+        vol = self.settings.effective_volume(self.settings.run_volume)
+        if vol <= 0 or dur_ms <= 0 or freq <= 0: return
+        self.engine.submit(self.cache.get(self._hz(freq), int(dur_ms), vol), int(dur_ms), "tick")
+
+    def play_stop(self):
+        """Stop tones (use the stop volume), mixed into one chime."""
+        vol = self.settings.effective_volume(self.settings.stop_volume)
+        if vol <= 0: return
+        events, total_ms = self._pitched(self.settings.stop_events())
+        if events:
+            self.engine.submit(self.cache.get_sequence(events, vol), total_ms, "stop")
+
+    def play_input(self):
+        """"Input needed" chime (stop volume): the child is asking the user something."""
+        vol = self.settings.effective_volume(self.settings.stop_volume)
+        if vol <= 0: return
+        events, total_ms = self._pitched(self.settings.input_events())
+        if events:
+            self.engine.submit(self.cache.get_sequence(events, vol), total_ms, "stop")
+
+    def play_fail(self):
+        """Failure chime (stop volume): a marked command finished with a non-zero exit code."""
+        vol = self.settings.effective_volume(self.settings.stop_volume)
+        if vol <= 0: return
+        events, total_ms = self._pitched(self.settings.fail_events())
+        if events:
+            self.engine.submit(self.cache.get_sequence(events, vol), total_ms, "stop")
+
+    def stream_ticks(self, params, keep_going, on_done=None) -> bool:
+        """Loop the tick+silence period for `params` (Settings.tick_params()) on the engine.
+
+        Returns False (and starts nothing) if the ticks are silent or disabled.
+        """
+        f, ms, gap, _stream, vol = params
+        if vol <= 0 or ms <= 0 or f <= 0: return False
+        track = self.cache.get_track(self._hz(f), ms, max(ms, gap), vol)
+        self.engine.stream(track, keep_going, on_done)
+        return True
+
+    def stats(self) -> dict:
+        """Tone cache and audio engine counters."""
+        return {"tones": self.cache.stats(), "audio": self.engine.stats()}
+
+    # ===================== Warm-up (render off the hot path) =====================
+    def _warm_up(self, reason: str, stale, changes=None):
+        s = self.settings
+        if changes:   # render what Apply is about to set: it is assigned only once this is cached
+            with s.lock: s = replace(s, **changes)
+        with s.lock:
+            f, ms, gap = s.run_freq, s.run_ms, s.run_gap
+        f = self._hz(f)
+        rvol, svol = s.effective_volume(s.run_volume), s.effective_volume(s.stop_volume)
+        jobs = [
+            (f"tick {f} Hz/{ms} ms", lambda: self.cache.get(f, ms, rvol)),
+            (f"tick stream {max(ms, gap)} ms period", lambda: self.cache.get_track(f, ms, max(ms, gap), rvol)),
+        ]
+        for name, chime in (("stop", s.stop_events()), ("input", s.input_events()), ("fail", s.fail_events())):
+            events, _ = self._pitched(chime)
+            if events:
+                jobs.append((f"{name} chime {'+'.join(f'{e[0]}/{e[1]}' for e in events)}",
+                             lambda events=events: self.cache.get_sequence(events, svol)))
+        wavs = []
+        for name, render in jobs:
+            t = time.perf_counter()
+            wavs.append(render())
+            timing_log(f"warm-up [{reason}] {name}: {(time.perf_counter() - t) * 1000:.2f} ms")
+        t = time.perf_counter()
+        self.engine.sink.preload(wavs)
+        timing_log(f"warm-up [{reason}] sink preload ({self.engine.sink.name}): "
+                   f"{(time.perf_counter() - t) * 1000:.2f} ms")
+        self.discard(stale)
+
+    def discard(self, stale):
+        """Drop the (freq, ms) tones old settings rendered, once their replacements are cached."""
+        for f, ms in stale: self.cache.discard(self._hz(f), ms)
+
+    def warm_up(self, reason="startup", stale=(), background=True, changes=None):
+        """Render tick, tick stream and stop chime (in the background); playback finds them cached.
+
+        changes: Settings fields about to be set; their sounds are rendered instead of the
+        current ones (the caller assigns them afterwards).
+        """
+        if not background: return self._warm_up(reason, tuple(stale), changes)
+        threading.Thread(target=self._warm_up, args=(reason, tuple(stale), changes), name="warm-up",
+                         daemon=True).start()
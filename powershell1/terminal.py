@@ -0,0 +1,295 @@
+# terminal.py — child terminal backends for the wrapper
+# - WinptyTerminal: ConPTY via pywinpty, keys from msvcrt (Windows)
+# - PosixTerminal: pty.fork with a non-blocking master fd and selectors, raw-mode stdin,
+#   window size propagated on SIGWINCH (Linux/macOS)
+# Both give the wrapper the same surface: read / write / isalive / read_keys / close, plus
+# fileno / read_available / input_fileno / write_fileno / write_available so an event loop
+# can wait on them instead of threads.
+# - Passthrough: child bytes to binary stdout, coalesced (flush on size, age, or child quiet)
+import codecs, os, select, subprocess, sys, time
+
+DEFAULT_COMMAND = ["powershell.exe"] if sys.platform == "win32" else [os.environ.get("SHELL") or "/bin/sh"]
+
+class Terminal:
+    """A child process on a pseudo-terminal plus the console that drives it."""
+
+    def read(self, n=65536) -> bytes:
+        """Raw child output; blocks until some arrives, b"" once the child is gone."""
+        raise NotImplementedError
+
+    def wait_readable(self, timeout) -> bool:
+        """True if read() would return without blocking (within timeout seconds)."""
+        return True
+
+    def fileno(self):
+        """Descriptor that turns readable when child output arrives, or None (use a thread)."""
+        return None
+
+    def read_available(self, n=65536):
+        """One read that never blocks: bytes, b"" once the child is gone, None if nothing yet."""
+        return self.read(n) if self.wait_readable(0) else None
+
+    def input_fileno(self):
+        """Descriptor that turns readable on a keystroke, or None (call read_keys on a thread)."""
+        return None
+
+    def write(self, data: str):
+        raise NotImplementedError
+
+    def write_fileno(self):
+        """Descriptor that turns writable when the child can take more input, or None
+        (write_available() then takes everything)."""
+        return None
+
+    def write_available(self, data: bytes) -> int:
+        """Write what the child takes without blocking (UTF-8 bytes); returns the count written."""
+        self.write(data.decode("utf-8", "replace"))
+        return len(data)
+
+    def isalive(self) -> bool:
+        raise NotImplementedError
+
+    def read_keys(self, timeout=None):
+        """Every keystroke available, translated, as one string.
+
+        Blocks until a key arrives (or `timeout` seconds pass: returns ""); returns None
+        once the console input is closed.
+        """
+        raise NotImplementedError
+
+    def setwinsize(self, rows: int, cols: int):
+        pass
+
+    def close(self):
+        pass
+
+class WinptyTerminal(Terminal):
+    def __init__(self, argv, console=True):
+        from winpty import PtyProcess
+        import msvcrt
+        self._msvcrt = msvcrt
+        self.console = console
+        self.proc = PtyProcess.spawn(subprocess.list2cmdline(argv))
+        # pywinpty relays ConPTY output through a local socket as UTF-8; read that directly
+        # instead of PtyProcess.read(), which decodes to str.
+        self._sock = getattr(self.proc, "fileobj", None)
+
+    IDLE_MARK = b"0011Ignore"   # pywinpty's keep-alive filler on the relay socket
+
+    def read(self, n=65536) -> bytes:
+        if self._sock is None:
+            try:
+                return self.proc.read(n).encode("utf-8")
+            except EOFError:
+                return b""
+        while True:
+            try:
+                data = self._sock.recv(n)
+            except OSError:
+                return b""
+            if not data: return b""
+            data = data.replace(self.IDLE_MARK, b"")
+            if data: return data
+
+    def wait_readable(self, timeout) -> bool:
+        if self._sock is None: return True
+        return bool(select.select([self._sock], [], [], timeout)[0])
+
+    def fileno(self):
+        return None if self._sock is None else self._sock.fileno()
+
+    def read_available(self, n=65536):
+        if self._sock is None: return super().read_available(n)
+        if not self.wait_readable(0): return None
+        try:
+            data = self._sock.recv(n)
+        except OSError:
+            return b""
+        if not data: return b""
+        return data.replace(self.IDLE_MARK, b"") or None   # keep-alive only: nothing yet
+
+    def write(self, data: str):
+        self.proc.write(data)
+
+    def isalive(self) -> bool:
+        return self.proc.isalive()
+
+    def read_keys(self, timeout=None):
+        if not self.console: return None
+        kb = self._msvcrt
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+            while not kb.kbhit():
+                if time.monotonic() >= deadline: return ""
+                time.sleep(0.01)
+        keys = [kb.getwch()]          # waits inside the console API; no polling
+        while kb.kbhit():             # a paste is already buffered: take all of it
+            keys.append(kb.getwch())
+        return "".join(keys).replace('\r', '\r\n')   # Enter -> CRLF; Ctrl+C passes as \x03
+
+    def setwinsize(self, rows: int, cols: int):
+        self.proc.setwinsize(rows, cols)
+
+class PosixTerminal(Terminal):
+    def __init__(self, argv, stdin=None, console=True):
+        import pty, selectors, signal
+        self.argv = list(argv)
+        self.pid, self.fd = pty.fork()
+        if self.pid == 0:  # child
+            try:
+                os.execvp(self.argv[0], self.argv)
+            finally:
+                os._exit(127)
+        os.set_blocking(self.fd, False)
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(self.fd, selectors.EVENT_READ)
+        self._status = None
+
+        self._saved_tty = None
+        self._in_eof = not console   # background job: no keyboard
+        if console:
+            self.stdin = sys.stdin.fileno() if stdin is None else stdin
+            self._in_sel = selectors.SelectSelector()   # epoll refuses regular files (< script.txt)
+            self._in_sel.register(self.stdin, selectors.EVENT_READ)
+            self._in_decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        if console and os.isatty(self.stdin):
+            import termios, tty
+            self._saved_tty = termios.tcgetattr(self.stdin)
+            tty.setraw(self.stdin)   # keys (Ctrl+C included) go to the child untouched
+        self._sync_winsize()
+        prev = signal.getsignal(signal.SIGWINCH)
+        def on_winch(sig, frm):
+            self._sync_winsize()
+            if callable(prev): prev(sig, frm)   # other terminals in this process resize too
+        try:
+            signal.signal(signal.SIGWINCH, on_winch)
+        except ValueError:
+            pass  # not the main thread; size is set once
+
+    def _sync_winsize(self):
+        try:
+            cols, rows = os.get_terminal_size(sys.stdout.fileno())
+            self.setwinsize(rows, cols)
+        except OSError:
+            pass   # no console, or this terminal is already closed
+
+    def setwinsize(self, rows: int, cols: int):
+        import fcntl, struct, termios
+        fcntl.ioctl(self.fd, termios.TIOCSWINSZ, struct.pack("HHHH", rows, cols, 0, 0))
+
+    def read(self, n=65536) -> bytes:
+        while True:
+            try:
+                return os.read(self.fd, n)
+            except BlockingIOError:
+                self._sel.select()
+            except OSError:    # EIO: slave side closed
+                return b""
+
+    def wait_readable(self, timeout) -> bool:
+        return bool(self._sel.select(timeout))
+
+    def fileno(self):
+        return self.fd
+
+    def read_available(self, n=65536):
+        try:
+            return os.read(self.fd, n)
+        except BlockingIOError:
+            return None
+        except OSError:    # EIO: slave side closed
+            return b""
+
+    def input_fileno(self):
+        return None if self._in_eof else self.stdin
+
+    def write(self, data: str):
+        buf = memoryview(data.encode("utf-8"))
+        while buf:
+            try:
+                buf = buf[os.write(self.fd, buf):]
+            except BlockingIOError:
+                time.sleep(0.001)
+
+    def write_fileno(self):
+        return self.fd
+
+    def write_available(self, data: bytes) -> int:
+        try:
+            return os.write(self.fd, data)
+        except BlockingIOError:
+            return 0
+
+    def isalive(self) -> bool:
+        if self._status is None:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid: self._status = status
+        return self._status is None
+
+    MAX_KEYS = 1 << 20
+
+    def read_keys(self, timeout=None):
+        if self._in_eof: return None
+        if not self._in_sel.select(timeout): return ""
+        data = os.read(self.stdin, 65536)
+        while data and len(data) < self.MAX_KEYS and self._in_sel.select(0):
+            more = os.read(self.stdin, 65536)
+            if not more: break
+            data += more
+        if not data:
+            self._in_eof = True   # stdin closed (scripted/headless run): stop forwarding
+            return None
+        return self._in_decoder.decode(data)
+
+    def close(self):
+        if self._saved_tty is not None:
+            import termios
+            termios.tcsetattr(self.stdin, termios.TCSADRAIN, self._saved_tty)
+            self._saved_tty = None
+        try: os.close(self.fd)
+        except OSError: pass
+        try: self.isalive()   # reap it if it has exited (background jobs end before the wrapper)
+        except ChildProcessError: pass
+
+class Passthrough:
+    """Child output to binary stdout in few large writes.
+
+    Bytes are buffered and written once MAX_BYTES pile up or the oldest byte is MAX_DELAY
+    old; the reader also calls flush() as soon as the child has nothing more pending, so
+    interactive echo is never held back.
+    """
+    MAX_BYTES = 64 * 1024
+    MAX_DELAY = 0.008
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout.buffer
+        self._buf = bytearray()
+        self._since = 0.0
+        self.writes = 0
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._buf)
+
+    def write(self, data: bytes):
+        if not self._buf: self._since = time.monotonic()
+        self._buf += data
+        if len(self._buf) >= self.MAX_BYTES or time.monotonic() - self._since >= self.MAX_DELAY:
+            self.flush()
+
+    def flush(self):
+        if not self._buf: return
+        self.out.write(self._buf)
+        self.out.flush()
+        self._buf.clear()
+        self.writes += 1
+
+def open_terminal(argv=None, console=True) -> Terminal:
+    """Spawn argv (default: powershell.exe on Windows, $SHELL elsewhere) on this OS's backend.
+
+    console=False: a background job that never reads the keyboard.
+    """
+    argv = list(argv or DEFAULT_COMMAND)
+    if sys.platform == "win32":
+        return WinptyTerminal(argv, console)
+    return PosixTerminal(argv, console=console)
@@ -0,0 +1,388 @@
+# tones.py — tone synth for the PowerShell wrapper (NumPy optional)
+# - One waveform period rendered with NumPy when it is installed, else via map() chains over
+#   C builtins, then tiled with array repeat
+#   (600 Hz @ 44.1 kHz repeats every 147 samples, so a 30 ms tick computes 147 sines, not 1323)
+# - Samples land straight in a preallocated WAV buffer (header packed in place)
+# - Mixer: (freq, ms, offset, gain) sequences with attack/release ramps, summed and clipped
+# - Wavetable oscillator (phase accumulator + linear interpolation) for phase-continuous chains
+# - On-disk WAV cache named by content hash, reused across runs (winsound file fallback)
+import functools, hashlib, math, operator, os, struct, sys, tempfile, threading
+from array import array
+from collections import OrderedDict
+from itertools import repeat
+try:
+    import numpy
+except ImportError:   # optional: the map() renderer is the fallback
+    numpy = None
+
+SAMPLE_RATE = 44100
+ATTACK_MS  = 3              # fade-in at tone start (no click)
+RELEASE_MS = 6              # fade-out at tone end
+TABLE_SIZE = 4096           # wavetable entries per sine cycle
+WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")  # 44 bytes, 16-bit mono PCM
+
+def pack_wav_header(buf, sub2: int, sample_rate: int):
+    """Pack the 44-byte header for `sub2` bytes of 16-bit mono PCM at the start of `buf`."""
+    WAV_HEADER.pack_into(
+        buf, 0,
+        b"RIFF", 36 + sub2, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", sub2
+    )
+
+def period_samples(freq_hz, sample_rate=SAMPLE_RATE):
+    """Samples after which a sampled sine repeats exactly, or None for non-integer Hz."""
+    f = float(freq_hz)
+    if f <= 0 or not f.is_integer(): return None
+    return sample_rate // math.gcd(int(f), sample_rate)
+
+def _sample_count(dur_ms, sample_rate):
+    return max(1, int(sample_rate * (dur_ms / 1000.0)))
+
+def _sine(freq_hz, m: int, amp: float, sample_rate) -> array:
+    # int(amp * sin(w * (i / sample_rate))) for i < m, vectorized, else evaluated inside map()
+    w = 2.0 * math.pi * float(freq_hz)
+    if numpy is not None:
+        x = amp * numpy.sin(w * (numpy.arange(m) / sample_rate))
+        return array("h", x.astype(numpy.int16).tobytes())   # truncates toward 0, like int()
+    t = map(sample_rate.__rtruediv__, range(m))
+    return array("h", map(int, map(amp.__mul__, map(math.sin, map(w.__mul__, t)))))
+
+def tile(pcm: array, n: int) -> array:
+    """Repeat `pcm` end to end and cut to exactly n samples."""
+    if len(pcm) >= n: return pcm[:n]
+    out = pcm * -(-n // len(pcm))
+    del out[n:]
+    return out
+
+def pcm16(freq_hz: int, dur_ms: int, vol_pct: int, sample_rate=SAMPLE_RATE) -> array:
+    """Signed 16-bit samples of a sine tone (amplitude = 32767 * vol_pct / 100)."""
+    n = _sample_count(dur_ms, sample_rate)
+    vol = max(0, min(vol_pct, 100)) / 100.0
+    m = min(n, period_samples(freq_hz, sample_rate) or n)
+    return tile(_sine(freq_hz, m, float(int(32767 * vol)), sample_rate), n)
+
+def unit_period(freq_hz: int, dur_ms: int, sample_rate=SAMPLE_RATE):
+    """Full-scale samples for one repeat period (or the whole tone) plus the tone length."""
+    n = _sample_count(dur_ms, sample_rate)
+    m = min(n, period_samples(freq_hz, sample_rate) or n)
+    return _sine(freq_hz, m, 32767.0, sample_rate), n
+
+# ===================== Wavetable oscillator =====================
+# Measured under CPython, map() over C math.sin beats the table lookup + interpolation chain
+# (bench.py wavetable), so one-shot tones keep _sine(); the oscillator is for chained tones.
+_TABLE = array("d", map(math.sin, map((2.0 * math.pi / TABLE_SIZE).__mul__, range(TABLE_SIZE + 1))))
+_SLOPE = array("d", map(operator.sub, _TABLE[1:], _TABLE[:-1]))
+
+class Oscillator:
+    """Sine by table lookup with a phase accumulator; phase carries over between render() calls."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, phase=0.0):
+        self.sample_rate = sample_rate
+        self.phase = phase          # table position, 0 <= phase < TABLE_SIZE
+
+    def render(self, freq_hz, n: int, amp=32767.0) -> array:
+        inc = float(freq_hz) * TABLE_SIZE / self.sample_rate
+        pos = list(map(float(TABLE_SIZE).__rmod__, map(self.phase.__add__, map(inc.__mul__, range(n)))))
+        idx = list(map(int, pos))
+        # table[i] + slope[i] * frac, all inside map()
+        val = map(operator.add, map(_TABLE.__getitem__, idx),
+                  map(operator.mul, map(_SLOPE.__getitem__, idx), map(operator.sub, pos, idx)))
+        self.phase = (self.phase + inc * n) % TABLE_SIZE
+        return array("h", map(int, map(float(amp).__mul__, val)))
+
+def render_chain(segments, sample_rate=SAMPLE_RATE) -> array:
+    """Back-to-back (freq, ms, gain) tones from one oscillator: no phase jump at the joins."""
+    osc, pcm = Oscillator(sample_rate), array("h")
+    for freq_hz, dur_ms, gain in segments:
+        pcm += osc.render(freq_hz, _sample_count(dur_ms, sample_rate), 32767.0 * gain)
+    return pcm
+
+def pad_wav(wav: bytes, total_ms: int) -> bytes:
+    """Extend a WAV with trailing silence to total_ms (never shortens it)."""
+    sample_rate = WAV_HEADER.unpack_from(wav)[7]
+    sub2 = max(len(wav) - WAV_HEADER.size, 2 * _sample_count(total_ms, sample_rate))
+    buf = bytearray(WAV_HEADER.size + sub2)
+    pack_wav_header(buf, sub2, sample_rate)
+    buf[WAV_HEADER.size:len(wav)] = memoryview(wav)[WAV_HEADER.size:]
+    return bytes(buf)
+
+# ===================== Gain stage (volume applied after synthesis) =====================
+def scale_pcm(pcm: array, vol_pct: int) -> array:
+    """Scale samples by vol_pct with a Q15 integer multiply (100% returns a copy)."""
+    g = (max(0, min(int(vol_pct), 100)) * 32768) // 100
+    if g >= 32768: return array("h", pcm)
+    return array("h", map((15).__rrshift__, map(g.__mul__, pcm)))
+
+def scale_wav(wav: bytes, vol_pct: int) -> bytes:
+    """Gain-scale an already rendered WAV, keeping its header."""
+    sample_rate = WAV_HEADER.unpack_from(wav)[7]
+    return wav_from_pcm(scale_pcm(pcm_from_wav(wav), vol_pct), sample_rate)
+
+def wav_from_pcm(pcm: array, sample_rate=SAMPLE_RATE) -> bytes:
+    """Wrap 16-bit mono samples in a WAV header (little-endian on every host)."""
+    if sys.byteorder != "little":
+        pcm = array("h", pcm); pcm.byteswap()
+    sub2 = len(pcm) * 2
+    buf = bytearray(WAV_HEADER.size + sub2)
+    pack_wav_header(buf, sub2, sample_rate)
+    memoryview(buf)[WAV_HEADER.size:] = memoryview(pcm).cast("B")
+    return bytes(buf)
+
+def wav_bytes(freq_hz: int, dur_ms: int, vol_pct: int, sample_rate=SAMPLE_RATE) -> bytes:
+    """Render a tone as an in-memory WAV (for winsound SND_MEMORY)."""
+    return wav_from_pcm(pcm16(freq_hz, dur_ms, vol_pct, sample_rate), sample_rate)
+
+def pcm_from_wav(wav: bytes) -> array:
+    pcm = array("h")
+    pcm.frombytes(memoryview(wav)[WAV_HEADER.size:])
+    if sys.byteorder != "little": pcm.byteswap()
+    return pcm
+
+# ===================== Mixer (envelopes, sequences, overlap) =====================
+@functools.lru_cache(maxsize=64)
+def _ramp(n: int) -> array:
+    return array("d", map((1.0 / n).__mul__, range(n)))  # 0 .. (n-1)/n
+
+def apply_envelope(pcm: array, sample_rate=SAMPLE_RATE, attack_ms=ATTACK_MS, release_ms=RELEASE_MS):
+    """Linear fade-in/fade-out over the tone edges, in place."""
+    a = min(int(sample_rate * attack_ms / 1000), len(pcm) // 2)
+    r = min(int(sample_rate * release_ms / 1000), len(pcm) - a)
+    if a: pcm[:a] = array("h", map(int, map(operator.mul, pcm[:a], _ramp(a))))
+    if r: pcm[-r:] = array("h", map(int, map(operator.mul, pcm[-r:], reversed(_ramp(r)))))
+
+def mix(parts, n=0) -> array:
+    """Sum (pcm, offset_samples) parts into one buffer (>= n samples), clipped to 16 bits."""
+    n = max([n] + [off + len(p) for p, off in parts])
+    acc = array("i", bytes(4 * n))
+    for p, off in parts:
+        acc[off:off + len(p)] = array("i", map(operator.add, acc[off:off + len(p)], p))
+    return array("h", map(min, map(max, acc, repeat(-32768)), repeat(32767)))
+
+def render_sequence(events, sample_rate=SAMPLE_RATE) -> array:
+    """One buffer from (freq, ms, offset_ms, gain 0..1) events; tones may overlap.
+
+    An event starting exactly where the previous one ends is chained to it: one oscillator,
+    continuous phase, and the fade ramps only at the outer edges of the chain.
+    """
+    chains = []
+    for freq_hz, dur_ms, offset_ms, gain in events:
+        offset_ms = max(0, offset_ms)
+        if chains and chains[-1][1] == offset_ms:
+            chains[-1][2].append((freq_hz, dur_ms, gain))
+            chains[-1][1] += dur_ms
+        else:
+            chains.append([offset_ms, offset_ms + dur_ms, [(freq_hz, dur_ms, gain)]])
+    parts = []
+    for start_ms, _end, segs in chains:
+        if len(segs) == 1:
+            freq_hz, dur_ms, gain = segs[0]
+            period, n = unit_period(freq_hz, dur_ms, sample_rate)
+            pcm = tile(scale_pcm(period, gain * 100), n)
+        else:
+            pcm = render_chain(segs, sample_rate)
+        apply_envelope(pcm, sample_rate)
+        parts.append((pcm, int(sample_rate * start_ms / 1000)))
+    return mix(parts)
+
+def mix_wavs(wavs) -> bytes:
+    """Mix (wav, offset_sec) pairs of the same sample rate into one WAV."""
+    sample_rate = WAV_HEADER.unpack_from(wavs[0][0])[7]
+    return wav_from_pcm(mix([(pcm_from_wav(w), int(max(0.0, t) * sample_rate)) for w, t in wavs]),
+                        sample_rate)
+
+# ===================== Rendered-tone cache (LRU, byte budget) =====================
+class ToneCache:
+    """Rendered tones, LRU-evicted under a byte budget.
+
+    Two kinds of entry share the budget: the full-scale period of each (freq, ms, rate),
+    synthesized once, and finished WAVs per (freq, ms, volume, rate) made from it by the
+    gain stage. A volume change therefore re-scales but never re-synthesizes.
+    """
+
+    def __init__(self, max_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        self.renders = self.rescales = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None: self._items.move_to_end(key)
+            return item
+
+    def _store(self, key, item):
+        with self._lock:
+            if key in self._items: return
+            self._items[key] = item
+            self._bytes += self._size(item)
+            self._evict()
+
+    def get(self, freq_hz: int, dur_ms: int, vol_pct: int, sample_rate=SAMPLE_RATE) -> bytes:
+        f, ms, sr = int(freq_hz), int(dur_ms), int(sample_rate)
+        key = (f, ms, int(vol_pct), sr)
+        wav = self._lookup(key)
+        if wav is not None:
+            self.hits += 1
+            return wav
+        self.misses += 1
+        ukey = (f, ms, None, sr)
+        unit = self._lookup(ukey)
+        if unit is None:
+            self.renders += 1
+            unit = unit_period(f, ms, sr)  # synthesize outside the lock
+            self._store(ukey, unit)
+        self.rescales += 1
+        period, n = unit
+        pcm = tile(scale_pcm(period, vol_pct), n)
+        apply_envelope(pcm, sr)
+        wav = wav_from_pcm(pcm, sr)
+        self._store(key, wav)
+        return wav
+
+    def get_sequence(self, events, vol_pct: int, sample_rate=SAMPLE_RATE) -> bytes:
+        """Mixed multi-tone sound (see render_sequence) at a volume; also gain-staged."""
+        events = tuple(tuple(e) for e in events)
+        sr = int(sample_rate)
+        key = ("seq", events, int(vol_pct), sr)
+        wav = self._lookup(key)
+        if wav is not None:
+            self.hits += 1
+            return wav
+        self.misses += 1
+        ukey = ("seq", events, None, sr)
+        unit = self._lookup(ukey)
+        if unit is None:
+            self.renders += 1
+            unit = render_sequence(events, sr)
+            self._store(ukey, unit)
+        self.rescales += 1
+        wav = wav_from_pcm(scale_pcm(unit, vol_pct), sr)
+        self._store(key, wav)
+        return wav
+
+    def get_track(self, freq_hz: int, dur_ms: int, gap_ms: int, vol_pct: int,
+                  sample_rate=SAMPLE_RATE) -> bytes:
+        """One tick-stream period: the tick followed by silence, gap_ms from tick start to tick start."""
+        key = (int(freq_hz), int(dur_ms), int(vol_pct), int(sample_rate), "track", int(gap_ms))
+        wav = self._lookup(key)
+        if wav is not None:
+            self.hits += 1
+            return wav
+        wav = pad_wav(self.get(freq_hz, dur_ms, vol_pct, sample_rate), gap_ms)
+        self._store(key, wav)
+        return wav
+
+    @staticmethod
+    def _size(item) -> int:
+        if isinstance(item, tuple): item = item[0]   # (full-scale period, n)
+        return len(item) * (item.itemsize if isinstance(item, array) else 1)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._items) > 1:
+            _, old = self._items.popitem(last=False)
+            self._bytes -= self._size(old)
+            self.evictions += 1
+
+    def discard(self, freq_hz: int, dur_ms: int):
+        """Drop every rendering of one tone (all volumes / rates)."""
+        with self._lock:
+            for key in [k for k in self._items if (k[0], k[1]) == (freq_hz, dur_ms)
+                        or k[0] == "seq" and any((e[0], e[1]) == (freq_hz, dur_ms) for e in k[1])]:
+                self._bytes -= self._size(self._items.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "renders": self.renders, "rescales": self.rescales}
+
+tone_cache = ToneCache()
+
+# ===================== On-disk tone cache (content-addressed, LRU) =====================
+def default_cache_dir() -> str:
+    base = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "Jobs", "tones")
+
+class DiskToneCache:
+    """WAV files named by the hash of their bytes; kept across runs, LRU-pruned to max_bytes.
+
+    A file is written once ever, and its mtime is bumped once per run (that is the LRU
+    clock); after that, path_for() is a dict lookup.
+    """
+
+    def __init__(self, path=None, max_bytes=16 * 1024 * 1024):
+        self.path = path or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._paths = OrderedDict()   # id(wav) -> (wav, path); holding wav keeps the id valid
+        self._seen = set()            # digests touched this run
+        self._lock = threading.Lock()
+        self.writes = self.hits = 0
+
+    def path_for(self, wav: bytes) -> str:
+        """Path of a file holding exactly these WAV bytes, writing it if it doesn't exist yet."""
+        with self._lock:
+            known = self._paths.get(id(wav))
+            if known is not None and known[0] is wav:
+                self.hits += 1
+                return known[1]
+        digest = hashlib.blake2b(wav, digest_size=16).hexdigest()
+        path = os.path.join(self.path, digest + ".wav")
+        if digest not in self._seen:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                os.makedirs(self.path, exist_ok=True)
+                # A temp file of its own per writer: the warm-up thread and the audio worker
+                # (or another process) may write the same digest at once.
+                fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.path)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(wav)
+                try:
+                    os.replace(tmp, path)   # same bytes whoever wins
+                except OSError:
+                    os.remove(tmp)          # Windows: the other writer's file is open (playing)
+                    if not os.path.exists(path): raise
+                with self._lock:
+                    self.writes += 1
+                self.prune()
+            with self._lock:
+                self._seen.add(digest)
+        with self._lock:
+            self._paths[id(wav)] = (wav, path)
+            while len(self._paths) > 64:
+                self._paths.popitem(last=False)
+        return path
+
+    def preload(self, wavs):
+        for wav in wavs:
+            self.path_for(wav)
+
+    def prune(self):
+        """Delete least recently used files until the directory fits max_bytes."""
+        try:
+            entries = [e for e in os.scandir(self.path) if e.name.endswith(".wav")]
+        except FileNotFoundError:
+            return
+        stats = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in entries), reverse=True)
+        total, removed = 0, set()
+        for _mtime, size, path in stats:
+            total += size
+            if total > self.max_bytes:
+                try: os.remove(path)
+                except OSError: continue
+                removed.add(path)
+        if removed:
+            with self._lock:
+                for key in [k for k, (_w, p) in self._paths.items() if p in removed]:
+                    del self._paths[key]
+            self._seen -= {os.path.basename(p)[:-4] for p in removed}
@@ -0,0 +1,58 @@
+# vt.py — streaming ANSI/VT classification of child output chunks
+# - CONTENT: new printable text (new lines, plain output, echo)
+# - REDRAW:  text drawn over itself: \r progress bars, \b spinners, cursor-up multi-line
+#   redraws, prompt repaints (\r + erase line)
+# - CONTROL: escape sequences / control bytes only (cursor blink, OSC title updates, colors)
+# Escape sequences split across chunks are carried over, so classification is exact
+# whatever the read size. Work is a few C-level regex / translate passes per chunk.
+import re
+
+CONTENT = "content"
+REDRAW  = "redraw"
+CONTROL = "control"
+CLASSES = (CONTENT, REDRAW, CONTROL)
+
+_ESC = re.compile(
+    rb"\x1b\[[0-?]*[ -/]*[@-~]"                       # CSI
+    rb"|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)"            # OSC ... BEL / ST
+    rb"|\x1b[P^_X][^\x1b]*\x1b\\"                     # DCS / PM / APC / SOS ... ST
+    rb"|\x1b[ -/]*[0-~]")                             # two-byte / charset escapes
+_PARTIAL = re.compile(                                 # an escape the chunk ends in the middle of
+    rb"(?:\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*\x1b?|[P^_X][^\x1b]*\x1b?|[ -/]*)|\r)\Z")
+# Cursor moves back over text already written: \r (not \r\n), \b, CUU / CPL (weighted by
+# their count), CUP / VPA / CHA. Erasing (ESC[K, ESC[J) is not a move: ConPTY ends most lines
+# with ESC[K and gcc / grep --color wrap colored text in it.
+_MOVES = re.compile(rb"\r(?!\n)|\x08|\x1b\[([0-9]*)[AF]|\x1b\[[0-9;]*[HfdG]")
+_CONTROLS = bytes(range(32)) + b"\x7f"
+MAX_CARRY = 4096   # longer unterminated sequences are treated as text
+
+def strip(data: bytes) -> bytes:
+    """`data` without complete escape sequences (control bytes kept)."""
+    return _ESC.sub(b"", data)
+
+class VtClassifier:
+    """Feed raw output chunks in order; each gets CONTENT, REDRAW or CONTROL."""
+
+    def __init__(self):
+        self._carry = b""
+        self.counts = dict.fromkeys(CLASSES, 0)
+
+    def feed(self, data: bytes) -> str:
+        if self._carry:
+            data = self._carry + data
+            self._carry = b""
+        if b"\x1b" not in data and b"\r" not in data and b"\x08" not in data:   # plain text
+            kind = CONTENT if data.translate(None, _CONTROLS) else CONTROL
+            self.counts[kind] += 1
+            return kind
+        m = _PARTIAL.search(data, max(0, len(data) - MAX_CARRY))
+        if m:
+            self._carry = data[m.start():]
+            data = data[:m.start()]
+        if not _ESC.sub(b"", data).translate(None, _CONTROLS):
+            kind = CONTROL
+        else:
+            moves = sum(int(n or 1) for n in _MOVES.findall(data))   # non-CUU / CPL matches: b""
+            kind = CONTENT if not moves or data.count(b"\n") > moves else REDRAW   # more new lines than overwrites
+        self.counts[kind] += 1
+        return kind